@@ -0,0 +1,23 @@
+"""
+Shared scratch space for the voice actor test scripts
+"""
+
+import atexit
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+_scratch_dir: Optional[Path] = None
+
+
+def tts_scratch_dir() -> Path:
+    """
+    A temporary directory for voiced lines, created on first use and reused
+    for the rest of the process. It is removed when the process exits.
+    """
+    global _scratch_dir
+    if _scratch_dir is None:
+        _scratch_dir = Path(tempfile.mkdtemp(prefix="rpg-test-voices"))
+        atexit.register(shutil.rmtree, _scratch_dir, ignore_errors=True)
+    return _scratch_dir
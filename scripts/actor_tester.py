@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 import logging
-import tempfile
+from functools import partial
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, Sequence, Set
 
+from _scratch import tts_scratch_dir
 from dotenv import load_dotenv
-from textual import on
+from textual import on, work
 from textual.app import App, ComposeResult
 from textual.containers import HorizontalScroll, VerticalScroll
 from textual.logging import TextualHandler
@@ -23,7 +24,7 @@ class ChooseSpeakerId(ModalScreen[str]):
     Simple dialog screen for picking the speaker id
     """
 
-    def __init__(self, speaker_ids: List[str]):
+    def __init__(self, speaker_ids: Sequence[str]):
         super().__init__()
         self.speaker_ids = speaker_ids
 
@@ -62,9 +63,17 @@ class VoiceActorScreen(Screen):
     }
     """
 
-    def __init__(self, actors: Dict[str, VoiceActor], audio_player: AudioPlayer):
+    def __init__(
+        self,
+        actor_factories: Dict[str, Callable[[], VoiceActor]],
+        audio_player: AudioPlayer,
+    ):
         super().__init__()
-        self.actors: Dict[str, VoiceActor] = actors
+        # Actors are loaded the first time they're used, so the screen shows
+        # straight away instead of waiting on every model
+        self.actor_factories: Dict[str, Callable[[], VoiceActor]] = actor_factories
+        self.actors: Dict[str, VoiceActor] = {}
+        self._loading: Set[str] = set()
         self.audio_player: AudioPlayer = audio_player
 
         def delete_callback(path: Path):
@@ -72,10 +81,7 @@ class VoiceActorScreen(Screen):
 
         self.audio_player.register_finished_callback(delete_callback)
 
-        self._tmp: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory(
-            prefix="rpg-test-voices"
-        )
-        self.temp_folder_path: Path = Path(self._tmp.name)
+        self.temp_folder_path: Path = tts_scratch_dir()
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -84,8 +90,8 @@ class VoiceActorScreen(Screen):
         yield Rule(line_style="thick")
         yield Label("Test Voice Actors:")
         with HorizontalScroll(id="actor_buttons"):
-            for name, actor in self.actors.items():
-                btn = Button(f"{actor.__class__.__name__}:\n{name}", classes="actor")
+            for name in self.actor_factories:
+                btn = Button(name, classes="actor")
                 btn.data = {"name": name}
                 yield btn
         yield Label("Not tested anything yet", id="test_label")
@@ -100,15 +106,34 @@ class VoiceActorScreen(Screen):
     async def handle_speak_button(self, event: Button.Pressed) -> None:
         info = getattr(event.button, "data", {}) or {}
         name: str = info.get("name")
-        actor: VoiceActor = self.actors[name]
+        actor = self.actors.get(name)
+        if actor is None:
+            if name not in self._loading:
+                self._loading.add(name)
+                self.query_one("#test_label", Label).update(f"Loading {name}…")
+                self._load_actor(name)
+            return
+        self._choose_speaker(actor, name)
+
+    @work(thread=True, group="load")
+    def _load_actor(self, name: str) -> None:
+        actor: VoiceActor = self.actor_factories[name]()
+        self.app.call_from_thread(self._actor_loaded, name, actor)
+
+    def _actor_loaded(self, name: str, actor: VoiceActor) -> None:
+        self.actors[name] = actor
+        self._loading.discard(name)
+        self.query_one("#test_label", Label).update(f"Loaded {name}")
+        self._choose_speaker(actor, name)
+
+    def _choose_speaker(self, actor: VoiceActor, name: str) -> None:
         if len(actor.speaker_names) > 1:
-            speaker_names = sorted(actor.speaker_names)
             self.app.push_screen(
-                ChooseSpeakerId(speaker_names),
+                ChooseSpeakerId(actor.sorted_speaker_names),
                 lambda result: self._after_choice(result, actor, name),
             )
         else:
-            self._after_choice(list(actor.speaker_names)[0], actor, name)
+            self._after_choice(actor.sorted_speaker_names[0], actor, name)
 
     def _after_choice(self, result: str | None, actor: VoiceActor, name: str) -> None:
         if not result:
@@ -118,29 +143,31 @@ class VoiceActorScreen(Screen):
         message = ChatMessage.speech(result, text)
         label: Label = self.query_one("#test_label")
         label.update(f"Played: {name} with speaker id {result}")
+        self._speak(actor, message)
+
+    @work(thread=True, group="speak")
+    def _speak(self, actor: VoiceActor, message: ChatMessage) -> None:
+        # Synthesis is CPU bound so it runs off the UI thread
         if actor.can_speak_out_loud:
             actor.speak_message_out_load(message)
         else:
             audio_path = actor.speak_message(message, self.temp_folder_path)
-            self.audio_player.play_file(audio_path)
+            self.app.call_from_thread(self.audio_player.play_file, audio_path)
 
 
 class VoiceActorTestApp(App):
     TITLE = "Voice Actor Test App"
 
     def on_ready(self) -> None:
-        actors: Dict[str, VoiceActor] = {}
-        actor1 = PiperVoiceActor.with_all_speaker_ids(
-            "piper-models/en_US-lessac-medium.onnx"
-        )
-        actors["en_US-lessac-medium"] = actor1
-        actor2 = PiperVoiceActor.with_all_speaker_ids(
-            "piper-models/en_US-libritts-high.onnx"
-        )
-        actors["en_US-libritts-high"] = actor2
+        factories: Dict[str, Callable[[], VoiceActor]] = {
+            name: partial(
+                PiperVoiceActor.with_all_speaker_ids, f"piper-models/{name}.onnx"
+            )
+            for name in ("en_US-lessac-medium", "en_US-libritts-high")
+        }
 
         audio_player = SoundDevicePlayer()
-        va_screen = VoiceActorScreen(actors, audio_player)
+        va_screen = VoiceActorScreen(factories, audio_player)
         self.install_screen(va_screen, "va")
         self.push_screen("va")
 
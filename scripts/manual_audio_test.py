@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
-import math
-import struct
 import tempfile
 import wave
 from pathlib import Path
 
+import numpy as np
+
 from rpg_player.audio_player import SoundDevicePlayer
 
 
@@ -16,15 +16,15 @@ def generate_sine_wave(
     amplitude: float = 0.5,
 ):
     n_frames = int(samplerate * duration)
+    t = np.arange(n_frames, dtype=np.float64)
+    samples = (
+        amplitude * 32767.0 * np.sin(2 * np.pi * frequency * t / samplerate)
+    ).astype(np.int16)
     with wave.open(str(filename), "w") as wf:
         wf.setnchannels(1)  # mono
         wf.setsampwidth(2)  # 16-bit
         wf.setframerate(samplerate)
-        for i in range(n_frames):
-            value = int(
-                amplitude * 32767.0 * math.sin(2 * math.pi * frequency * i / samplerate)
-            )
-            wf.writeframesraw(struct.pack("<h", value))
+        wf.writeframes(samples.astype("<i2").tobytes())
 
 
 def main():
@@ -1,8 +1,8 @@
 #!/usr/bin/env python3
-import tempfile
-import time
+import threading
 from pathlib import Path
 
+from _scratch import tts_scratch_dir
 from dotenv import load_dotenv
 from openai import OpenAI
 
@@ -55,20 +55,17 @@ def main():
         print("Stream speaking done")
     else:
         print("File speaking")
-        tmp: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory(
-            prefix="rpg-test-voices"
-        )
-        temp_folder_path: Path = Path(tmp.name)
-        path = actor.speak_message(message, temp_folder_path)
+        path = actor.speak_message(message, tts_scratch_dir())
         audio_player: AudioPlayer = SoundDevicePlayer()
+        done = threading.Event()
 
         def callback(path: Path):
             path.unlink(missing_ok=True)
+            done.set()
 
         audio_player.register_finished_callback(callback)
         audio_player.play_file(path)
-        while audio_player.is_playing:
-            time.sleep(0.1)
+        done.wait()
         print("File speaking done")
 
 
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+import argparse
+from pathlib import Path
+
+from onnxruntime.quantization import QuantType, quantize_dynamic
+
+from rpg_player.piper_voice_actor import quantized_model_path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Create an int8 quantized copy of a Piper model. PiperVoiceActor "
+            "will use it instead of the original when running on the CPU. "
+            "Needs the onnx package, e.g. run with: "
+            "uv run --with onnx python scripts/quantize_piper_model.py MODEL"
+        )
+    )
+    parser.add_argument("model_path", type=Path, help="The Piper .onnx model")
+    args = parser.parse_args()
+
+    model_path: Path = args.model_path
+    output_path: Path = quantized_model_path(model_path)
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+    print(f"Wrote {output_path}")
+
+
+if __name__ == "__main__":
+    main()
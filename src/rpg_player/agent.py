@@ -1,11 +1,17 @@
+import asyncio
 import logging
 from abc import ABC, abstractmethod
-from typing import List, Optional, override
+from functools import partial
+from types import MappingProxyType
+from typing import Any, Callable, List, Mapping, NamedTuple, Optional, override
 
 from ollama import Client
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 from .chat_message import ChatMessage, ChatMessages
+from .rate_limiter import AsyncResponsesLimiter
+from .response_cache import ResponseCache, SemanticResponseCache
+from .response_text import extract_output_text
 
 
 class Agent(ABC):
@@ -13,15 +19,12 @@ class Agent(ABC):
     The base class for an AI Agent.
 
     AI Agents are fed the current messages and generate a response to them.
+
+    Implementations must set `name` in their constructor.
     """
 
-    @property
-    @abstractmethod
-    def name(self) -> str:
-        """
-        The name of the agent
-        """
-        raise NotImplementedError
+    name: str
+    """The name of the agent"""
 
     @abstractmethod
     def respond(self, messages: ChatMessages) -> ChatMessage:
@@ -33,6 +36,44 @@ class Agent(ABC):
         """
         raise NotImplementedError
 
+    def respond_stream(
+        self, messages: ChatMessages, handler: Callable[[str], None]
+    ) -> ChatMessage:
+        """
+        Respond like `respond` but pass text to the handler as it is
+        generated.
+
+        The handler can be called multiple times with each new piece of text.
+        The full message is still returned at the end. By default this calls
+        `respond` and passes the whole text to the handler once.
+        """
+        response: ChatMessage = self.respond(messages)
+        handler(response.content)
+        return response
+
+    async def arespond(self, messages: ChatMessages) -> ChatMessage:
+        """
+        Asynchronous version of `respond`.
+
+        By default this runs `respond` in a thread. Implementations with an
+        asynchronous client should override this so multiple agents can be
+        awaited concurrently without tying up threads.
+        """
+        return await asyncio.to_thread(self.respond, messages)
+
+    async def arespond_stream(
+        self, messages: ChatMessages, handler: Callable[[str], None]
+    ) -> ChatMessage:
+        """
+        Asynchronous version of `respond_stream`.
+
+        The handler is called on the event loop's thread. By default this
+        awaits `arespond` and passes the whole text to the handler once.
+        """
+        response: ChatMessage = await self.arespond(messages)
+        handler(response.content)
+        return response
+
 
 class DummyAgent(Agent):
     """
@@ -40,17 +81,18 @@ class DummyAgent(Agent):
     """
 
     def __init__(self, name: str, message: str):
-        self._name: str = name
+        self.name: str = name
         self.message: str = message
 
-    @property
-    @override
-    def name(self) -> str:
-        return self._name
-
     @override
     def respond(self, messages: ChatMessages) -> ChatMessage:
-        return ChatMessage.speech(self._name, self.message)
+        return ChatMessage.speech(self.name, self.message)
+
+
+class _CacheLookup(NamedTuple):
+    message: Optional[ChatMessage] = None
+    key: Optional[str] = None
+    embedding: Optional[List[float]] = None
 
 
 class OpenAIAgent(Agent):
@@ -59,16 +101,27 @@ class OpenAIAgent(Agent):
 
     You will need to provide the client, the model, a name for the agent and a
     system prompt.
+
+    An optional `ResponseCache` can be given to skip the API call when the
+    exact same request has been made before, and an optional
+    `SemanticResponseCache` to skip it when the recent messages are close in
+    meaning to an earlier request. Caches are bypassed when a `temperature`
+    above 0 is set, to keep sampling behaviour intact.
+
+    An `AsyncResponsesLimiter` shared between agents can be given to keep
+    concurrent `arespond` calls within OpenAI's rate limits.
     """
 
-    RESERVED_KEYS: dict[str] = {
-        "model",
-        "input",
-        "instructions",
-        "tool_choice",
-        "stream",
-        "max_output_tokens",
-    }
+    RESERVED_KEYS: frozenset[str] = frozenset(
+        {
+            "model",
+            "input",
+            "instructions",
+            "tool_choice",
+            "stream",
+            "max_output_tokens",
+        }
+    )
     """Keyword arguments that are reserved and should not appear in extra_kwargs"""
 
     def __init__(
@@ -79,9 +132,19 @@ class OpenAIAgent(Agent):
         model: str = "gpt-4.1",
         max_tokens: int = 3000,
         extra_kwargs: Optional[dict] = None,
+        async_openai: Optional[AsyncOpenAI] = None,
+        response_cache: Optional[ResponseCache] = None,
+        semantic_cache: Optional[SemanticResponseCache] = None,
+        rate_limiter: Optional[AsyncResponsesLimiter] = None,
     ):
         self.openai: OpenAI = openai
-        self._name: str = name
+        # When given, arespond sends requests through this instead
+        self.rate_limiter: Optional[AsyncResponsesLimiter] = rate_limiter
+        # Created on first use of arespond if not given
+        self._async_openai: Optional[AsyncOpenAI] = async_openai
+        self.response_cache: Optional[ResponseCache] = response_cache
+        self.semantic_cache: Optional[SemanticResponseCache] = semantic_cache
+        self.name: str = name
         self.system_prompt: str = system_prompt
         self.model: str = model
         self.max_tokens: int = max_tokens
@@ -89,69 +152,212 @@ class OpenAIAgent(Agent):
         self.log = logging.getLogger(f"OpenAIAgent-{name}")
 
         extra_kwargs = extra_kwargs or {}
-        intersection = OpenAIAgent.RESERVED_KEYS & extra_kwargs.keys()
-        if intersection:
+        if extra_kwargs and (
+            intersection := OpenAIAgent.RESERVED_KEYS & extra_kwargs.keys()
+        ):
             raise ValueError(
                 (
                     "extra_kwargs contains reserved keyword(s) "
                     f"that will be overwritten: {sorted(intersection)}"
                 )
             )
-        # Consolidate static params for responses.create
-        self.response_kwargs = {
-            "model": model,
-            "instructions": self.system_message,
-            "tool_choice": "none",
-            "stream": False,
-            "max_output_tokens": max_tokens,
-        }
-        self.response_kwargs.update(extra_kwargs)
-
-    @property
-    @override
-    def name(self) -> str:
-        return self._name
+        # Consolidate static params for responses.create, these are fixed for
+        # the life of the agent so the create call is bound once here
+        self.response_kwargs: Mapping[str, Any] = MappingProxyType(
+            {
+                "model": model,
+                "instructions": self.system_message,
+                "tool_choice": "none",
+                "stream": False,
+                "max_output_tokens": max_tokens,
+                **extra_kwargs,
+            }
+        )
+        self._create = partial(self.openai.responses.create, **self.response_kwargs)
+        self._cache_scope: str = SemanticResponseCache.make_scope(self.system_message)
 
     @staticmethod
     def _gen_system_message(prompt: str, name: str) -> str:
+        """
+        Build the instructions sent with every request.
+
+        This must stay deterministic (no timestamps, IDs etc.) so the request
+        prefix is identical between turns and OpenAI's prompt caching can
+        reuse it.
+        """
         name_reminder = f"Your name will show up in messages as: {name}"
         return f"{prompt}\n\n{name_reminder}"
 
+    @property
+    def async_openai(self) -> AsyncOpenAI:
+        """
+        The async client used by `arespond`.
+
+        If one was not given, it is created from the sync client's settings.
+        """
+        if self._async_openai is None:
+            api_key = getattr(self.openai, "api_key", None)
+            base_url = getattr(self.openai, "base_url", None)
+            self._async_openai = AsyncOpenAI(api_key=api_key, base_url=base_url)
+        return self._async_openai
+
     @override
     def respond(self, messages: ChatMessages) -> ChatMessage:
         request_msgs: List[dict] = messages.as_openai
-        response = self.openai.responses.create(  # pyright: ignore[reportCallIssue]
+        lookup: _CacheLookup = self._lookup_cache(request_msgs)
+        if lookup.message:
+            return lookup.message
+        response = self._create(input=request_msgs)
+        return self._to_message(response, lookup)
+
+    @override
+    async def arespond(self, messages: ChatMessages) -> ChatMessage:
+        request_msgs: List[dict] = messages.as_openai
+        if self.semantic_cache:
+            # Embedding is a blocking API call
+            lookup = await asyncio.to_thread(self._lookup_cache, request_msgs)
+        else:
+            lookup = self._lookup_cache(request_msgs)
+        if lookup.message:
+            return lookup.message
+        response = await self._acreate(  # pyright: ignore[reportCallIssue]
             input=request_msgs,  # pyright: ignore[reportArgumentType]
             **self.response_kwargs,
         )
+        return self._to_message(response, lookup)
+
+    @override
+    def respond_stream(
+        self, messages: ChatMessages, handler: Callable[[str], None]
+    ) -> ChatMessage:
+        request_msgs: List[dict] = messages.as_openai
+        lookup: _CacheLookup = self._lookup_cache(request_msgs)
+        if lookup.message:
+            handler(lookup.message.content)
+            return lookup.message
+        stream = self._create(input=request_msgs, stream=True)
+        collected: List[str] = []
+        final_response = None
+        for event in stream:
+            match event.type:
+                case "response.output_text.delta":
+                    if event.delta:
+                        collected.append(event.delta)
+                        handler(event.delta)
+                case "response.completed":
+                    final_response = event.response
+        if final_response is not None:
+            return self._to_message(final_response, lookup)
+        # Stream ended early, use what we have
+        return ChatMessage.speech(self.name, "".join(collected).strip())
+
+    @override
+    async def arespond_stream(
+        self, messages: ChatMessages, handler: Callable[[str], None]
+    ) -> ChatMessage:
+        request_msgs: List[dict] = messages.as_openai
+        if self.semantic_cache:
+            lookup = await asyncio.to_thread(self._lookup_cache, request_msgs)
+        else:
+            lookup = self._lookup_cache(request_msgs)
+        if lookup.message:
+            handler(lookup.message.content)
+            return lookup.message
+        stream = await self._acreate(
+            input=request_msgs,  # pyright: ignore[reportArgumentType]
+            **{**self.response_kwargs, "stream": True},
+        )
+        collected: List[str] = []
+        final_response = None
+        try:
+            async for event in stream:
+                match event.type:
+                    case "response.output_text.delta":
+                        if event.delta:
+                            collected.append(event.delta)
+                            handler(event.delta)
+                    case "response.completed":
+                        final_response = event.response
+        finally:
+            # Frees the connection, and the rate limiter's place, if the
+            # handler fails part way through
+            close = getattr(stream, "close", None)
+            if close is not None:
+                await close()
+        if final_response is not None:
+            return self._to_message(final_response, lookup)
+        # Stream ended early, use what we have
+        return ChatMessage.speech(self.name, "".join(collected).strip())
+
+    @property
+    def _acreate(self) -> Callable:
+        # The async create call, going through the rate limiter if there is one
+        if self.rate_limiter is not None:
+            return self.rate_limiter.create
+        return self.async_openai.responses.create
+
+    @property
+    def _caching_allowed(self) -> bool:
+        temperature = self.response_kwargs.get("temperature")
+        return temperature is None or temperature <= 0
+
+    def _lookup_cache(self, request_msgs: List[dict]) -> _CacheLookup:
+        if not self._caching_allowed:
+            return _CacheLookup()
+        key: Optional[str] = None
+        if self.response_cache is not None:
+            key = ResponseCache.make_key(
+                {"input": request_msgs, **self.response_kwargs}
+            )
+            cached_text: Optional[str] = self.response_cache.get(key)
+            if cached_text is not None:
+                self.log.debug("Response cache hit: %s", key)
+                return _CacheLookup(ChatMessage.speech(self.name, cached_text))
+        embedding: Optional[List[float]] = None
+        if self.semantic_cache is not None:
+            query: str = self.semantic_cache.query_text(request_msgs)
+            embedding = self.semantic_cache.embed(query)
+            cached_text = self.semantic_cache.lookup(self._cache_scope, embedding)
+            if cached_text is not None:
+                self.log.debug("Semantic cache hit")
+                return _CacheLookup(ChatMessage.speech(self.name, cached_text))
+        return _CacheLookup(None, key, embedding)
+
+    def _to_message(
+        self, response, lookup: Optional[_CacheLookup] = None
+    ) -> ChatMessage:
+        self._log_usage(response)
         output_text = OpenAIAgent._extract_text(response)
         if not output_text:
             self.log.warning(
                 "No assistant message in response; got: %s", response.output
             )
-        return ChatMessage.speech(self._name, output_text)
+        elif lookup:
+            if lookup.key is not None:
+                self.response_cache.put(lookup.key, output_text)
+            if lookup.embedding is not None:
+                self.semantic_cache.add(
+                    self._cache_scope, lookup.embedding, output_text
+                )
+        return ChatMessage.speech(self.name, output_text)
+
+    def _log_usage(self, response):
+        # Shows if OpenAI's prompt caching is being hit
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        details = getattr(usage, "input_tokens_details", None)
+        cached_tokens: int = getattr(details, "cached_tokens", 0) or 0
+        self.log.info(
+            "Input tokens: %s (%s cached), output tokens: %s",
+            usage.input_tokens,
+            cached_tokens,
+            usage.output_tokens,
+        )
 
     @staticmethod
     def _extract_text(response) -> str:
-        # Prefer walking the structured output
-        out = getattr(response, "output", None) or []
-        collected: list[str] = []
-
-        for item in out:
-            # GPT-4/GPT-5 both use 'message' items for assistant replies
-            if getattr(item, "type", None) == "message":
-                # item.content is a list of blocks; we want output_text blocks
-                for block in getattr(item, "content", []) or []:
-                    if getattr(block, "type", None) == "output_text":
-                        txt = getattr(block, "text", "") or ""
-                        if txt:
-                            collected.append(txt)
-
-        if collected:
-            return "\n".join(collected).strip()
-
-        # Fallback for SDK helpers that sometimes populate this
-        return (getattr(response, "output_text", "") or "").strip()
+        return extract_output_text(response)
 
 
 class OllamaAgent(Agent):
@@ -175,7 +381,7 @@ class OllamaAgent(Agent):
     ):
         self.ollama: Client = client
 
-        self._name: str = name
+        self.name: str = name
         self.model: str = model
         self.max_tokens: int = max_tokens
         self.log = logging.getLogger(f"OllamaAgent-{name}")
@@ -183,11 +389,6 @@ class OllamaAgent(Agent):
             system_prompt, name
         )
 
-    @property
-    @override
-    def name(self) -> str:
-        return self._name
-
     @staticmethod
     def _gen_system_message(prompt: str, name: str) -> dict[str, str]:
         name_reminder = f"Your name will show up in messages as: {name}"
@@ -196,17 +397,19 @@ class OllamaAgent(Agent):
 
     @override
     def respond(self, messages: ChatMessages) -> ChatMessage:
-        all_messages: List[dict] = [self._system_message]
-        request_msgs: List[dict] = []
-        for msg in messages.as_openai:
-            # Only difference between OpenAI and Ollama is that OpenAI supports
-            # "developer" in gpt-5 while Ollama still uses "system"
-            if msg["role"] == "developer":
-                new_msg = {"role": "system", "content": msg["content"]}
-                all_messages.append(new_msg)
-            else:
-                all_messages.append(msg)
-        all_messages.extend(request_msgs)
+        # Only difference between OpenAI and Ollama is that OpenAI supports
+        # "developer" in gpt-5 while Ollama still uses "system"
+        all_messages: List[dict] = [
+            self._system_message,
+            *(
+                (
+                    {"role": "system", "content": msg["content"]}
+                    if msg["role"] == "developer"
+                    else msg
+                )
+                for msg in messages.as_openai
+            ),
+        ]
 
         response = self.ollama.chat(
             model=self.model, messages=all_messages, stream=False
@@ -215,4 +418,4 @@ class OllamaAgent(Agent):
         output_text = response.message.content
         if not output_text:
             self.log.warning(f"No assistant message in response; got: {response}")
-        return ChatMessage.speech(self._name, output_text)
+        return ChatMessage.speech(self.name, output_text)
@@ -1,15 +1,19 @@
+from __future__ import annotations
+
 import argparse
 import asyncio
 import logging
 import os
 import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from random import Random
-from typing import Any, Callable, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Deque, List, Optional
 
 from dotenv import load_dotenv
-from openai import OpenAI
 from rich.markdown import Markdown
 from textual import on, work
 from textual.app import App, ComposeResult
@@ -17,16 +21,37 @@ from textual.containers import Horizontal, VerticalGroup
 from textual.events import Resize
 from textual.logging import TextualHandler
 from textual.screen import Screen
-from textual.widgets import Button, Footer, Header, Label, RichLog, Rule, Switch
+from textual.timer import Timer
+from textual.widgets import (
+    Button,
+    Footer,
+    Header,
+    Label,
+    RichLog,
+    Rule,
+    Static,
+    Switch,
+)
 
-from .agent import Agent, OpenAIAgent
-from .audio_transcriber import AudioTranscriber, OpenAIAudioTranscriber
 from .chat_message import ChatMessage
-from .config import Config
-from .message_transformer import ChatMessageTransformer, RemovePrefixMessageTransformer
 from .narration_screen import NarrationScreen
-from .state_machine import StateMachine
-from .voice_actor import VoiceActor, VoiceActorManager
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+    from .agent import Agent
+    from .audio_transcriber import AudioTranscriber
+    from .config import Config
+    from .message_transformer import ChatMessageTransformer
+    from .response_cache import ResponseCache
+    from .state_machine import StateMachine
+    from .voice_actor import VoiceActor
+
+_RANDOM: Random = Random()
+
+MAX_RENDERED_MESSAGES: int = 500
+# Seconds between redraws of a response that is streaming in
+PREVIEW_INTERVAL: float = 0.05
 
 
 class Standby(Screen):
@@ -40,20 +65,37 @@ class Standby(Screen):
         ("3", "agent_3_respond", "Agent 3 Respond"),
         ("a", "random_respond", "Random Respond"),
         ("r", "random_not_last_respond", "Not Last Respond"),
+        ("t", "all_respond", "All Respond"),
     ]
 
-    def __init__(self, state_machine: StateMachine, transcriber: AudioTranscriber):
+    def __init__(
+        self,
+        state_machine: StateMachine,
+        transcriber: AudioTranscriber,
+        random: Optional[Random] = None,
+    ):
         super().__init__()
         self.state_machine: StateMachine = state_machine
         self.agent_names = state_machine.agent_names
-        self.random: Random = Random()
+        self._agent_indexes: dict[str, int] = {
+            name: i for i, name in enumerate(self.agent_names)
+        }
+        # Shared unless one is given, e.g. a seeded one for reproducibility
+        self.random: Random = random if random is not None else _RANDOM
         self._disable_bindings = threading.Event()
-        self.rendered_messages: list = []
+        # Only the most recent messages are kept to rewrite the log on resize
+        self.rendered_messages: Deque[Markdown] = deque(maxlen=MAX_RENDERED_MESSAGES)
         self.transcriber: AudioTranscriber = transcriber
+        self._last_width: int = 0
+        self._reflow_timer: Optional[Timer] = None
+        self._pending_text: str = ""
+        self._pending_timer: Optional[Timer] = None
+        self._last_preview: float = 0.0
 
     def compose(self) -> ComposeResult:
         yield Header()
         yield RichLog(id="messages", wrap=True)
+        yield Static(id="pending")
         yield Rule(line_style="thick")
         yield Label("Nothing has happened yet...", id="status")
         with Horizontal(id="buttons"):
@@ -64,16 +106,35 @@ class Standby(Screen):
                 yield btn
             yield Button("Random Respond", id="random")
             yield Button("Not Last Respond", id="not-last")
+            yield Button("All Respond", id="all")
             with VerticalGroup():
                 yield Label("Toggle Speaking")
                 yield Switch(id="speak-switch", tooltip="Toggle Speaking", value=True)
         yield Footer()
 
-    def on_mount(self) -> None:
-        # Make sure any pre-made messages are visible
-        for msg in self.state_machine.messages:
-            text = f"**{msg.author}:** {msg.content}"
-            self.add_message(text)
+    async def on_mount(self) -> None:
+        # Keep hold of widgets that are used often, rather than querying them
+        self._log: RichLog = self.query_one("#messages", RichLog)
+        self._pending: Static = self.query_one("#pending", Static)
+        self._status: Label = self.query_one("#status", Label)
+        self._speak_switch: Switch = self.query_one("#speak-switch", Switch)
+        self._response_buttons: List[Button] = list(
+            self.query("#buttons .agent").results(Button)
+        )
+        for button_id in ("narrate", "random", "not-last", "all"):
+            self._response_buttons.append(
+                self.query_one(f"#buttons #{button_id}", Button)
+            )
+        # Make sure any pre-made messages are visible. Parsing the markdown for
+        # a long history can take a while, so do it off the event loop
+        history = self.state_machine.messages.messages[-MAX_RENDERED_MESSAGES:]
+        rendered: List[Markdown] = await asyncio.to_thread(
+            lambda: [Markdown(f"**{m.author}:** {m.content}") for m in history]
+        )
+        with self.app.batch_update():
+            for md in rendered:
+                self._log.write(md, shrink=False)
+        self.rendered_messages.extend(rendered)
 
     @on(Button.Pressed, "#buttons #narrate")
     def handle_narrate(self, _: Button.Pressed):
@@ -93,14 +154,28 @@ class Standby(Screen):
     def handle_not_last(self, _: Button.Pressed) -> None:
         self.action_random_not_last_respond()
 
+    @on(Button.Pressed, "#buttons #all")
+    def handle_all(self, _: Button.Pressed) -> None:
+        self.action_all_respond()
+
     @on(Resize)
-    def _reflow_log(self, _: Resize) -> None:
-        # TODO: This might be a bit heavy with hundreds of messages
+    def _on_resize(self, event: Resize) -> None:
+        # RichLog doesn't rewrap old lines, so messages are rewritten when the
+        # width changes. Resizes come in bursts so wait for them to settle.
+        if event.size.width == self._last_width:
+            return
+        self._last_width = event.size.width
+        if self._reflow_timer is not None:
+            self._reflow_timer.stop()
+        self._reflow_timer = self.set_timer(0.15, self._reflow_log)
+
+    def _reflow_log(self) -> None:
+        self._reflow_timer = None
         if self.rendered_messages:
-            log: RichLog = self.query_one("#messages", RichLog)
-            log.clear()
-            for msg in self.rendered_messages:
-                log.write(msg, shrink=False)
+            with self.app.batch_update():
+                self._log.clear()
+                for msg in self.rendered_messages:
+                    self._log.write(msg, shrink=False)
 
     def action_agent_1_respond(self):
         if self._disable_bindings.is_set():
@@ -146,27 +221,62 @@ class Standby(Screen):
         self._disable_responses()
         self._update_label(f"{name} is thinking...")
         self.app.notify(f"{name} is thinking")
+        # Speech is started sentence by sentence while the response streams in
+        should_speak: bool = self._speak_switch.value
+        streamed: List[str] = []
+
+        def on_text(text: str) -> None:
+            # Called as the response is generated
+            if not streamed and should_speak:
+                self._update_label(f"{name} is speaking...")
+            streamed.append(text)
+            self._show_pending(name, "".join(streamed))
+
         try:
-            msg = await asyncio.to_thread(self.state_machine.agent_respond, number)
+            msg = await self.state_machine.aagent_respond_stream(
+                number, on_text, should_speak
+            )
         except Exception as e:
+            self._hide_pending()
             self._update_label(f"{name} failed to respond: {e}")
             self._enable_responses()
             self.app.notify(f"{name} failed to respond", severity="error")
             return
 
+        self._hide_pending()
         text = f"**{msg.author}:** {msg.content}"
         self.add_message(text)
 
-        speak_switch: Switch = self.query_one("#speak-switch")
-        should_speak: bool = speak_switch.value
+        self._update_label(f"{name} responded.")
+        self._enable_responses()
+
+    def action_all_respond(self) -> None:
+        if self._disable_bindings.is_set():
+            return
+        self.all_respond_async()
+
+    @work(exclusive=True, group="agent", exit_on_error=False)
+    async def all_respond_async(self):
+        self._disable_responses()
+        self._update_label("Everyone is thinking...")
+        self.app.notify("Everyone is thinking")
+        try:
+            msgs = await self.state_machine.all_agents_respond()
+        except Exception as e:
+            self._update_label(f"Failed to respond: {e}")
+            self._enable_responses()
+            self.app.notify("Failed to respond", severity="error")
+            return
 
-        if should_speak:
-            self._update_label(f"{name} is speaking...")
-            self.app.notify(f"{name} is speaking...")
+        for msg in msgs:
+            self.add_message(f"**{msg.author}:** {msg.content}")
 
-            await asyncio.to_thread(self.state_machine.play_message, msg)
+        if self._speak_switch.value:
+            for msg in msgs:
+                self._update_label(f"{msg.author} is speaking...")
+                await asyncio.wrap_future(self.state_machine.speak_message(msg))
 
-        self._update_label(f"{name} responded.")
+        self._update_label("Everyone responded.")
         self._enable_responses()
 
     def action_random_respond(self) -> None:
@@ -183,23 +293,47 @@ class Standby(Screen):
         last_msg: Optional[ChatMessage] = self.state_machine.get_last_message(["DM"])
         if not last_msg:
             return self.action_random_respond()
-        if last_msg.author not in self.agent_names:
+        bad_index: Optional[int] = self._agent_indexes.get(last_msg.author)
+        if bad_index is None:
             self.app.notify(f"Unknown agent: {last_msg.author}", severity="error")
             return self.action_random_respond()
-        bad_index = self.agent_names.index(last_msg.author)
-        index = bad_index
-        while index == bad_index:
-            index = self.random.randint(0, len(self.agent_names) - 1)
+        # Pick from the other agents by stepping past the last one
+        count = len(self.agent_names)
+        index = (bad_index + 1 + self.random.randrange(count - 1)) % count
         self.action_agent_respond(index)
 
     def add_message(self, text: str) -> None:
-        log: RichLog = self.query_one("#messages", RichLog)
         md = Markdown(text)
-        log.write(md, shrink=False)
+        self._log.write(md, shrink=False)
         self.rendered_messages.append(md)
 
+    def _show_pending(self, author: str, text: str) -> None:
+        # Text can arrive far quicker than it is worth redrawing, so renders
+        # are limited to one per PREVIEW_INTERVAL with the latest text
+        self._pending_text = f"**{author}:** {text}"
+        if self._pending_timer is not None:
+            return
+        wait: float = self._last_preview + PREVIEW_INTERVAL - time.monotonic()
+        if wait <= 0:
+            self._render_pending()
+        else:
+            self._pending_timer = self.set_timer(wait, self._render_pending)
+
+    def _render_pending(self) -> None:
+        self._pending_timer = None
+        self._last_preview = time.monotonic()
+        self._pending.update(Markdown(self._pending_text))
+        self._pending.display = True
+
+    def _hide_pending(self) -> None:
+        if self._pending_timer is not None:
+            self._pending_timer.stop()
+            self._pending_timer = None
+        self._pending.update("")
+        self._pending.display = False
+
     def _update_label(self, text: str) -> None:
-        self.query_one("#status").update(text)
+        self._status.update(text)
 
     def _disable_responses(self) -> None:
         self._toggle_responses(True)
@@ -212,11 +346,19 @@ class Standby(Screen):
             self._disable_bindings.set()
         else:
             self._disable_bindings.clear()
-        for btn in self.query("#buttons .agent"):
+        for btn in self._response_buttons:
             btn.disabled = disabled
-        self.query_one("#buttons #narrate").disabled = disabled
-        self.query_one("#buttons #random").disabled = disabled
-        self.query_one("#buttons #not-last").disabled = disabled
+
+
+class LoadingScreen(Screen):
+    """
+    Shown while the app is loading its config, agents and voice actors
+    """
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        yield Label("Loading...", id="loading")
+        yield Footer()
 
 
 class MainApp(App):
@@ -228,8 +370,33 @@ class MainApp(App):
             config_path = Path("config.json")
         self.config_path: Path = config_path
         self.chat_log_path: Optional[Path] = None
+        self.async_openai: Optional[AsyncOpenAI] = None
+        self.state_machine: Optional[StateMachine] = None
 
     def on_ready(self) -> None:
+        self.push_screen(LoadingScreen())
+        self._load()
+
+    @work(thread=True, exclusive=True, group="load")
+    def _load(self) -> None:
+        """
+        Load the config, agents and voice actors in a thread so the UI can be
+        drawn while it happens, then switch to the standby screen.
+        """
+        # These pull in the API SDKs and TTS models so they are imported here,
+        # after the first frame, rather than when the module loads
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        from .agent import OpenAIAgent
+        from .audio_transcriber import OpenAIAudioTranscriber
+        from .config import Config
+        from .message_transformer import RemovePrefixMessageTransformer
+        from .rate_limiter import AsyncResponsesLimiter
+        from .response_cache import SqliteResponseCache
+        from .state_machine import StateMachine
+        from .voice_actor import VoiceActorManager
+
         config_path: Path = self.config_path
         if not config_path.exists() or not config_path.is_file():
             raise ValueError(f"No config at {config_path}")
@@ -239,11 +406,32 @@ class MainApp(App):
         config: Config = Config.from_path(config_path)
         agents: List[Agent] = []
         # TODO: Make this neater
+        # One client is shared by every agent, voice actor and the transcriber
+        # so they reuse the same connection pool
         openai: OpenAI = _get_openai(config)
+        async_openai = AsyncOpenAI(
+            api_key=openai.api_key,
+            base_url=openai.base_url,
+            # Enough pooled connections that concurrent agents don't queue
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+            ),
+        )
+        self.async_openai = async_openai
+        rate_limiter = AsyncResponsesLimiter(async_openai)
+        response_cache: Optional[ResponseCache] = None
+        if config.response_cache_path:
+            response_cache = SqliteResponseCache(config.response_cache_path)
         gpt_models: set[str] = set()
         only_using_openai: bool = True
         for agent_conf in config.agents:
-            agent = agent_conf.create_agent(config.prompt_config, openai=openai)
+            agent = agent_conf.create_agent(
+                config.prompt_config,
+                openai=openai,
+                async_openai=async_openai,
+                rate_limiter=rate_limiter,
+                response_cache=response_cache,
+            )
             agents.append(agent)
             if isinstance(agent, OpenAIAgent):
                 gpt_models.add(agent.model)
@@ -257,9 +445,22 @@ class MainApp(App):
             system_role = "developer"
 
         voice_actors: VoiceActorManager = VoiceActorManager()
-        for actor_config in config.voice_actors:
-            actor: VoiceActor = actor_config.create_actor(config.api_keys)
+        # Actors can be slow to load (e.g. Piper models) so load them together
+        with ThreadPoolExecutor() as pool:
+            actors: List[VoiceActor] = list(
+                pool.map(
+                    lambda c: c.create_actor(config.api_keys, openai),
+                    config.voice_actors,
+                )
+            )
+        for actor in actors:
             voice_actors.register_actor(actor)
+        self.call_from_thread(
+            self.run_worker,
+            self._warm_voice_actors(actors),
+            group="warm",
+            exit_on_error=False,
+        )
 
         messages_path: Optional[Path] = config.messages_path
         message_listener: Optional[Callable[[ChatMessage], None]] = None
@@ -268,7 +469,7 @@ class MainApp(App):
             message_listener = self.append_message_to_file
         # TODO: Add transformer to config
         msg_transformer: ChatMessageTransformer = RemovePrefixMessageTransformer()
-        self.state_machine: StateMachine = StateMachine(
+        self.state_machine = StateMachine(
             agents,
             voice_actors,
             messages_file=messages_path,
@@ -298,9 +499,23 @@ class MainApp(App):
         transcriber: AudioTranscriber = OpenAIAudioTranscriber(
             openai, extra_kwargs=extra_transcriber_kwargs
         )
-        standby = Standby(self.state_machine, transcriber)
+        self.call_from_thread(self._show_standby, self.state_machine, transcriber)
+
+    def _show_standby(
+        self, state_machine: StateMachine, transcriber: AudioTranscriber
+    ) -> None:
+        standby = Standby(state_machine, transcriber)
         self.install_screen(standby, "standby")
-        self.push_screen("standby")
+        self.switch_screen("standby")
+
+    async def on_unmount(self) -> None:
+        if self.state_machine is not None:
+            await asyncio.to_thread(self.state_machine.close)
+        if self.async_openai is not None:
+            await self.async_openai.close()
+
+    async def _warm_voice_actors(self, actors: List[VoiceActor]) -> None:
+        await asyncio.gather(*(asyncio.to_thread(a.warm) for a in actors))
 
     def append_message_to_file(self, msg: ChatMessage):
         if not self.chat_log_path:
@@ -317,6 +532,8 @@ def _get_openai(config: Config) -> OpenAI:
     if api_keys:
         return api_keys.get_openai_client()
     else:
+        from openai import OpenAI
+
         openai_api_key: Optional[str] = os.getenv("OPENAI_API_KEY")
         return OpenAI(api_key=openai_api_key)
 
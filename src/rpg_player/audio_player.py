@@ -1,15 +1,249 @@
+import io
 import logging
+import os
+import queue
 import threading
+import wave
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Callable, Optional, override
+from typing import Callable, Iterable, List, Optional, Tuple, override
 
+import numpy as np
 import sounddevice as sd
 import soundfile as sf
 
 log = logging.getLogger(__name__)
 
 
+def _open_sequential(path: Path) -> sf.SoundFile:
+    """
+    Open a sound file, hinting to the kernel that it will be read straight
+    through so it can read ahead.
+    """
+    fd: int = os.open(path, os.O_RDONLY)
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            # Only a hint, not all filesystems support it
+            pass
+    try:
+        return sf.SoundFile(fd, closefd=True)
+    except Exception:
+        os.close(fd)
+        raise
+
+
+def play_wav_bytes(wav: bytes):
+    """
+    Play 16-bit WAV audio held in memory, blocking until it has finished
+    """
+    with wave.open(io.BytesIO(wav), "rb") as wf:
+        frames: bytes = wf.readframes(wf.getnframes())
+        sample_rate: int = wf.getframerate()
+        channels: int = wf.getnchannels()
+    with sd.RawOutputStream(
+        samplerate=sample_rate, channels=channels, dtype="int16", latency="low"
+    ) as stream:
+        stream.write(frames)
+
+
+class PCMRingBuffer:
+    """
+    A fixed size ring buffer of raw PCM bytes, shared between one producer
+    thread and one consumer.
+
+    The producer's `write` blocks while the buffer is full. The consumer's
+    `read_into` never blocks, so it can be used from an audio callback.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        :param capacity: Size of the buffer in bytes
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be greater than 0")
+        self.capacity: int = capacity
+        self._buffer: np.ndarray = np.zeros(capacity, dtype=np.uint8)
+        # Total bytes written and read, positions are these modulo capacity
+        self._written: int = 0
+        self._read: int = 0
+        self._finished: bool = False
+        self._aborted: bool = False
+        self._cond = threading.Condition()
+
+    @property
+    def available(self) -> int:
+        """
+        Bytes waiting to be read
+        """
+        return self._written - self._read
+
+    @property
+    def finished(self) -> bool:
+        """
+        True once the producer has finished and everything has been read
+        """
+        return self._finished and self.available == 0
+
+    @property
+    def aborted(self) -> bool:
+        """
+        True once `abort` has been called, the producer should stop
+        """
+        return self._aborted
+
+    def write(self, data: bytes):
+        """
+        Copy data into the buffer, waiting for space when it is full
+        """
+        src: np.ndarray = np.frombuffer(data, dtype=np.uint8)
+        while len(src):
+            with self._cond:
+                while (
+                    self.available == self.capacity
+                    and not self._aborted
+                    and not self._finished
+                ):
+                    self._cond.wait()
+                if self._aborted:
+                    return
+                count: int = min(len(src), self.capacity - self.available)
+                self._copy_in(src[:count])
+                self._written += count
+                self._cond.notify_all()
+            src = src[count:]
+
+    def _copy_in(self, src: np.ndarray):
+        start: int = self._written % self.capacity
+        first: int = min(len(src), self.capacity - start)
+        self._buffer[start : start + first] = src[:first]
+        self._buffer[: len(src) - first] = src[first:]
+
+    def read_into(self, out: np.ndarray) -> int:
+        """
+        Copy as many bytes as are available into out, returning the count
+        """
+        with self._cond:
+            count: int = min(len(out), self.available)
+            start: int = self._read % self.capacity
+            first: int = min(count, self.capacity - start)
+            out[:first] = self._buffer[start : start + first]
+            out[first:count] = self._buffer[: count - first]
+            self._read += count
+            self._cond.notify_all()
+        return count
+
+    def wait_for(self, count: int, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until at least count bytes are available or the producer has
+        finished
+        """
+        count = min(count, self.capacity)
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self.available >= count or self._finished or self._aborted,
+                timeout,
+            )
+
+    def finish(self):
+        """
+        Called by the producer once it has written everything
+        """
+        with self._cond:
+            self._finished = True
+            self._cond.notify_all()
+
+    def abort(self):
+        """
+        Stop the producer, any pending writes are dropped
+        """
+        with self._cond:
+            self._aborted = True
+            self._cond.notify_all()
+
+
+def _fill_ring(ring: PCMRingBuffer, chunks: Iterable[bytes], errors: list):
+    # Producer for play_pcm_stream, errors are collected to be raised later
+    try:
+        for chunk in chunks:
+            if ring.aborted:
+                # Playback has stopped, don't fetch the rest
+                break
+            if chunk:
+                ring.write(chunk)
+    except BaseException as e:
+        errors.append(e)
+    finally:
+        ring.finish()
+        # Stops a generator, and any request behind it, straight away
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def play_pcm_stream(
+    chunks: Iterable[bytes],
+    sample_rate: int,
+    channels: int = 1,
+    blocksize: int = 512,
+    prefill_ms: int = 0,
+    buffer_seconds: float = 10.0,
+):
+    """
+    Play a stream of 16-bit PCM chunks, blocking until it has finished.
+
+    Chunks are read on a separate thread into a `PCMRingBuffer` and played
+    from the output stream's callback, so a slow chunk doesn't hold up audio
+    that has already arrived.
+
+    :param chunks: The audio, chunks don't need to be aligned to frames
+    :param sample_rate: Sample rate of the audio
+    :param channels: Number of channels
+    :param blocksize: Frames per callback
+    :param prefill_ms: Milliseconds of audio to buffer before starting
+    :param buffer_seconds: Seconds of audio the buffer can hold
+    """
+    frame_bytes: int = 2 * channels
+    ring = PCMRingBuffer(int(sample_rate * buffer_seconds) * frame_bytes)
+    errors: List[BaseException] = []
+
+    def callback(outdata, frames: int, time, status):
+        out: np.ndarray = np.frombuffer(outdata, dtype=np.uint8)
+        count: int = ring.read_into(out)
+        if count < len(out):
+            # Underrun or the end of the audio, fill with silence
+            out[count:] = 0
+            if ring.finished:
+                raise sd.CallbackStop
+
+    producer = threading.Thread(
+        target=_fill_ring, args=(ring, chunks, errors), daemon=True
+    )
+    producer.start()
+    ring.wait_for(sample_rate * prefill_ms // 1000 * frame_bytes)
+    done = threading.Event()
+    try:
+        with sd.RawOutputStream(
+            samplerate=sample_rate,
+            channels=channels,
+            dtype="int16",
+            blocksize=blocksize,
+            latency="low",
+            callback=callback,
+            finished_callback=done.set,
+        ):
+            done.wait()
+    finally:
+        ring.abort()
+    # The producer may be stuck waiting on a slow chunk, it is a daemon so
+    # it isn't waited on for long
+    producer.join(timeout=1.0)
+    if errors:
+        raise errors[0]
+
+
 class AudioPlayer(ABC):
     """
     The basic interface for an audio player.
@@ -74,9 +308,25 @@ class SoundDevicePlayer(AudioPlayer):
 
     This implementation is non-blocking and supports pausing, resuming, and
     callbacks.
+
+    Audio is played with a stream callback on PortAudio's own thread. A
+    separate thread decodes the file a few blocks ahead into a ring of
+    reusable buffers, which the callback copies from. Pausing just makes the
+    callback output silence.
     """
 
-    def __init__(self, blocksize: int = 1024):
+    def __init__(
+        self,
+        blocksize: int = 4096,
+        ring_blocks: int = 8,
+        progress_interval: float = 0.1,
+    ):
+        """
+        :param blocksize: Frames in each block passed to the audio device
+        :param ring_blocks: How many blocks are decoded ahead of playback
+        :param progress_interval: Minimum seconds of audio between progress
+            callbacks
+        """
         self._thread: Optional[threading.Thread] = None
         self._stop_flag: threading.Event = threading.Event()
         self._unpaused: threading.Event = threading.Event()
@@ -88,6 +338,18 @@ class SoundDevicePlayer(AudioPlayer):
         self._duration: float = 0.0
         # loop sets this when it observes paused
         self._pause_ack = threading.Event()
+        # Ring of decoded blocks, indexes move between the free and filled
+        # queues so buffers are reused
+        self._ring_blocks: int = ring_blocks
+        self._buffers: Optional[np.ndarray] = None
+        self._free: queue.SimpleQueue[int] = queue.SimpleQueue()
+        self._filled: queue.SimpleQueue[Optional[Tuple[int, int]]] = queue.SimpleQueue()
+        # The block the callback is part way through and its position in it
+        self._current: Optional[Tuple[int, int]] = None
+        self._offset: int = 0
+        self._stream_done = threading.Event()
+        self._progress_interval: float = progress_interval
+        self._next_progress: float = 0.0
 
     @override
     def register_progress_callback(self, callback: Callable[[float, float], None]):
@@ -117,40 +379,56 @@ class SoundDevicePlayer(AudioPlayer):
         return True
 
     def _play_loop(self, path: Path):
+        # This thread decodes the file into a ring of buffers, the stream's
+        # callback plays them from PortAudio's audio thread
         try:
-            with sf.SoundFile(path) as f:
+            with _open_sequential(path) as f:
+                self._samplerate = f.samplerate
+                # 16-bit files are played as they are rather than converted
+                dtype: str = "int16" if f.subtype == "PCM_16" else "float32"
+                self._buffers = np.empty(
+                    (self._ring_blocks, self._blocksize, f.channels), dtype=dtype
+                )
+                self._free = queue.SimpleQueue()
+                self._filled = queue.SimpleQueue()
+                self._current = None
+                self._offset = 0
+                self._stream_done.clear()
+                self._next_progress = 0.0
+                for index in range(self._ring_blocks):
+                    self._free.put(index)
+
                 with sd.OutputStream(
                     samplerate=f.samplerate,
                     channels=f.channels,
+                    blocksize=self._blocksize,
                     latency="high",
-                    dtype="float32",
+                    dtype=dtype,
+                    callback=self._callback,
+                    finished_callback=self._stream_done.set,
                 ) as stream:
-                    self._samplerate = f.samplerate
-                    for block in f.blocks(blocksize=self._blocksize, dtype="float32"):
+                    while not self._stop_flag.is_set():
+                        try:
+                            index: int = self._free.get(timeout=0.1)
+                        except queue.Empty:
+                            # Sleep while paused, stop_audio also sets this
+                            self._unpaused.wait()
+                            continue
+                        self._report_progress()
+                        frames: int = len(f.read(out=self._buffers[index]))
+                        if not frames:
+                            self._free.put(index)
+                            break
+                        self._filled.put((index, frames))
+                    # Let the callback play what is left
+                    self._filled.put(None)
+                    while not self._stream_done.wait(timeout=0.1):
                         if self._stop_flag.is_set():
-                            # Stop playing
+                            stream.abort()
                             break
-                        if not self._unpaused.is_set():
-                            stream.stop()
-                            self._pause_ack.set()
-
-                            # Sleep efficiently until resume or stop
-                            while not self._stop_flag.is_set():
-                                if self._unpaused.wait(
-                                    timeout=0.1
-                                ):  # returns True if set (resumed)
-                                    break
-
-                            if self._stop_flag.is_set():
-                                break
-                            # Resume the stream and starts writing the same block
-                            stream.start()
-
-                        stream.write(block)
-                        self._frames_played += len(block)
-                        if self._progress_callback and self._samplerate > 0:
-                            elapsed_sec: float = self._frames_played / self._samplerate
-                            self._progress_callback(elapsed_sec, self._duration)
+                        self._report_progress()
+                        self._unpaused.wait()
+                    self._report_progress(force=True)
         except Exception as e:
             log.error(f"Playback error for {path}: {e}")
         finally:
@@ -163,12 +441,60 @@ class SoundDevicePlayer(AudioPlayer):
                 except Exception:
                     log.exception("finished call back failed")
 
+    def _callback(self, outdata: np.ndarray, frames: int, time, status):
+        # Runs on the audio thread so must not block
+        if self._stop_flag.is_set():
+            outdata.fill(0)
+            raise sd.CallbackAbort
+        if not self._unpaused.is_set():
+            outdata.fill(0)
+            self._pause_ack.set()
+            return
+        written: int = 0
+        while written < frames:
+            if self._current is None:
+                try:
+                    self._current = self._filled.get_nowait()
+                except queue.Empty:
+                    # Decoder has fallen behind, play silence
+                    break
+                if self._current is None:
+                    outdata[written:].fill(0)
+                    self._frames_played += written
+                    raise sd.CallbackStop
+                self._offset = 0
+            index, available = self._current
+            count: int = min(frames - written, available - self._offset)
+            outdata[written : written + count] = self._buffers[
+                index, self._offset : self._offset + count
+            ]
+            written += count
+            self._offset += count
+            if self._offset >= available:
+                self._free.put(index)
+                self._current = None
+        outdata[written:].fill(0)
+        self._frames_played += written
+
+    def _report_progress(self, force: bool = False):
+        if not self._unpaused.is_set():
+            # Nothing has moved
+            return
+        if self._progress_callback and self._samplerate > 0:
+            elapsed_sec: float = self._frames_played / self._samplerate
+            if not force and elapsed_sec < self._next_progress:
+                return
+            self._next_progress = elapsed_sec + self._progress_interval
+            self._progress_callback(elapsed_sec, self._duration)
+
     @override
     def stop_audio(self):
-        if self.is_playing:
+        if self.is_active:
+            thread = self._thread
             self._stop_flag.set()
             self._unpaused.set()
-            self._thread.join()
+            if thread is not None:
+                thread.join()
             self._thread = None
             log.info("Stopped playback")
         else:
@@ -196,6 +522,18 @@ class SoundDevicePlayer(AudioPlayer):
     def is_paused(self) -> bool:
         return bool(self.is_active and not self._unpaused.is_set())
 
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the current playback finishes.
+
+        Returns False if it was still playing when the timeout ran out.
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
     @property
     def is_active(self) -> bool:
         # True if a playback thread exists (playing or paused)
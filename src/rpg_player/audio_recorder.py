@@ -5,6 +5,7 @@ from abc import ABC, abstractmethod
 from pathlib import Path
 from typing import Callable, Optional
 
+import numpy as np
 import sounddevice as sd
 import soundfile as sf
 
@@ -50,59 +51,158 @@ class AudioRecorder(ABC):
         raise NotImplementedError
 
 
+class _CaptureRing:
+    """
+    A fixed size ring buffer of raw PCM bytes filled from an audio callback.
+
+    There is one producer (the callback) and one consumer (the writer
+    thread), each only moving its own position, so no lock is taken while
+    capturing. The event is only used to wake the writer. If the writer falls
+    behind and the ring fills up, new audio is dropped rather than blocking
+    the callback.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity: int = capacity
+        self._buffer: np.ndarray = np.zeros(capacity, dtype=np.uint8)
+        # Total bytes pushed and drained, positions are these modulo capacity
+        self._written: int = 0
+        self._read: int = 0
+        self.dropped: int = 0
+        self.data_ready = threading.Event()
+
+    def push(self, data) -> None:
+        src: np.ndarray = np.frombuffer(data, dtype=np.uint8)
+        count: int = len(src)
+        if count > self.capacity - (self._written - self._read):
+            self.dropped += count
+            return
+        start: int = self._written % self.capacity
+        first: int = min(count, self.capacity - start)
+        self._buffer[start : start + first] = src[:first]
+        self._buffer[: count - first] = src[first:]
+        self._written += count
+        self.data_ready.set()
+
+    def drain(self, write: Callable[[np.ndarray], None]) -> int:
+        """
+        Pass everything captured so far to write, in at most two slices,
+        returning the number of bytes drained
+        """
+        available: int = self._written - self._read
+        start: int = self._read % self.capacity
+        first: int = min(available, self.capacity - start)
+        if first:
+            write(self._buffer[start : start + first])
+        if available > first:
+            write(self._buffer[: available - first])
+        self._read += available
+        return available
+
+
 class SoundDeviceRecorder(AudioRecorder):
     """
     Implementation of AudioRecorder using sounddevice and soundfile.
     Non-blocking, supports progress callback.
+
+    Audio is captured by the PortAudio callback into a ring buffer, and a
+    separate thread writes it to the file, so slow disk writes don't cause
+    dropped input.
     """
 
     def __init__(
-        self, samplerate: int = 44100, channels: int = 1, subtype: str = "PCM_16"
+        self,
+        samplerate: int = 44100,
+        channels: int = 1,
+        subtype: str = "PCM_16",
+        blocksize: int = 1024,
+        buffer_seconds: float = 2.0,
+        progress_interval: float = 0.1,
     ):
+        """
+        :param blocksize: Frames captured per callback
+        :param buffer_seconds: Seconds of audio held while waiting to be
+            written to the file
+        :param progress_interval: Minimum seconds between progress callbacks
+        """
         self._thread: Optional[threading.Thread] = None
         self._stop_flag: threading.Event = threading.Event()
         self._progress_callback: Optional[Callable[[float], None]] = None
         self._samplerate = samplerate
         self._channels = channels
         self._subtype = subtype
-        self._start_time: Optional[float] = None
+        self._blocksize = blocksize
+        self._buffer_seconds = buffer_seconds
+        self._progress_interval: float = progress_interval
+        # Bytes written and when progress was last reported, for this recording
+        self._captured: int = 0
+        self._last_progress: float = 0.0
 
     async def start_recording(self, path: Path):
         if self.is_recording:
             log.warning(f"Already recording, ignoring start_recording({path})")
             return
         self._stop_flag.clear()
-        self._start_time = time.time()
+        self._captured = 0
+        self._last_progress = 0.0
+        frame_bytes: int = 2 * self._channels
+        ring = _CaptureRing(int(self._samplerate * self._buffer_seconds) * frame_bytes)
+        self._thread = threading.Thread(
+            target=self._record, args=(path, ring), daemon=True
+        )
+        self._thread.start()
 
-        def record_loop():
-            try:
-                with sf.SoundFile(
-                    path,
-                    mode="w",
+    def _record(self, path: Path, ring: _CaptureRing):
+        # Runs on the recording thread, writing out what the callback captures
+        def callback(indata, frames, time_info, status):
+            if status:
+                log.debug(f"Recording status: {status}")
+            ring.push(indata)
+
+        try:
+            with sf.SoundFile(
+                path,
+                mode="w",
+                samplerate=self._samplerate,
+                channels=self._channels,
+                subtype=self._subtype,
+            ) as file:
+                with sd.RawInputStream(
                     samplerate=self._samplerate,
                     channels=self._channels,
-                    subtype=self._subtype,
-                ) as file:
-                    with sd.InputStream(
-                        samplerate=self._samplerate,
-                        channels=self._channels,
-                        dtype="int16",
-                    ) as stream:
-                        while not self._stop_flag.is_set():
-                            data, _ = stream.read(1024)
-                            file.write(data)
-                            if self._progress_callback:
-                                elapsed = time.time() - self._start_time
-                                # Call callback with elapsed seconds
-                                try:
-                                    self._progress_callback(elapsed)
-                                except Exception:
-                                    log.exception("Progress callback failed")
-            except Exception as e:
-                log.error(f"Recording error: {e}")
-
-        self._thread = threading.Thread(target=record_loop, daemon=True)
-        self._thread.start()
+                    dtype="int16",
+                    blocksize=self._blocksize,
+                    callback=callback,
+                ):
+                    while not self._stop_flag.is_set():
+                        ring.data_ready.wait(0.1)
+                        ring.data_ready.clear()
+                        self._drain(ring, file)
+                # The stream has stopped, write whatever is left
+                self._drain(ring, file)
+            if ring.dropped:
+                log.warning(
+                    f"Recording fell behind, dropped {ring.dropped} bytes of audio"
+                )
+        except Exception as e:
+            log.error(f"Recording error: {e}")
+
+    def _drain(self, ring: _CaptureRing, file: sf.SoundFile):
+        def write(data: np.ndarray):
+            file.buffer_write(data, dtype="int16")
+
+        self._captured += ring.drain(write)
+        now = time.monotonic()
+        if (
+            self._progress_callback
+            and now - self._last_progress >= self._progress_interval
+        ):
+            self._last_progress = now
+            elapsed = self._captured / (2 * self._channels) / self._samplerate
+            try:
+                self._progress_callback(elapsed)
+            except Exception:
+                log.exception("Progress callback failed")
 
     async def stop_recording(self):
         if self.is_recording:
@@ -113,8 +213,16 @@ class SoundDeviceRecorder(AudioRecorder):
         else:
             log.warning("Stop called, but not currently recording")
 
-    def register_progress_callback(self, callback: Callable[[float], None]):
+    def register_progress_callback(
+        self, callback: Callable[[float], None], interval: Optional[float] = None
+    ):
+        """
+        :param interval: Minimum seconds between calls, defaults to the
+            recorder's progress_interval
+        """
         self._progress_callback = callback
+        if interval is not None:
+            self._progress_interval = interval
 
     @property
     def is_recording(self) -> bool:
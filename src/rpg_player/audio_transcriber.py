@@ -1,11 +1,79 @@
+import hashlib
+import json
+import logging
+import os
+import threading
 import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from random import Random
-from typing import Callable, Iterable, List, Optional, Union, override
+from typing import Callable, Iterable, List, Optional, Tuple, Union, override
 
+import numpy as np
+import soundfile as sf
 from openai import OpenAI
 
+from .wav_writer import wav_header
+
+log = logging.getLogger(__name__)
+
+# Set to 1 to ignore any transcript cache
+NO_CACHE_ENV: str = "RPG_NO_TRANSCRIPT_CACHE"
+
+
+def default_transcript_cache_folder() -> Path:
+    """
+    The default folder for cached transcripts, under the user's cache directory
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "rpg-player" / "transcripts"
+
+
+def find_speech(
+    samples: np.ndarray,
+    sample_rate: int,
+    threshold: float = 0.01,
+    min_silence: float = 0.5,
+    frame_seconds: float = 0.03,
+    padding: float = 0.1,
+) -> List[Tuple[int, int]]:
+    """
+    Find the regions of speech in some mono audio with a simple energy
+    threshold.
+
+    Returns (start, end) sample positions. Regions separated by less than
+    min_silence seconds are joined together.
+
+    :param samples: Mono samples scaled between -1 and 1
+    :param threshold: RMS level below which a frame is silent
+    :param min_silence: Seconds of silence that separate two regions
+    :param frame_seconds: Length of each frame the RMS is measured over
+    :param padding: Seconds kept either side of each region
+    """
+    frame: int = max(1, int(sample_rate * frame_seconds))
+    count: int = len(samples) // frame
+    if count == 0:
+        return []
+    frames = samples[: count * frame].reshape(count, frame)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    loud = np.flatnonzero(rms >= threshold)
+    if len(loud) == 0:
+        return []
+    # Split wherever the gap between loud frames is long enough
+    max_gap: int = max(1, int(min_silence / frame_seconds))
+    breaks = np.flatnonzero(np.diff(loud) > max_gap)
+    starts = np.concatenate(([loud[0]], loud[breaks + 1]))
+    ends = np.concatenate((loud[breaks], [loud[-1]]))
+    pad: int = int(sample_rate * padding)
+    return [
+        (
+            max(0, int(start) * frame - pad),
+            min(len(samples), (int(end) + 1) * frame + pad),
+        )
+        for start, end in zip(starts, ends)
+    ]
+
 
 class AudioTranscriber(ABC):
     """
@@ -62,8 +130,9 @@ class OpenAIAudioTranscriber(AudioTranscriber):
         - gpt-4o-transcribe
         - gpt-4o-mini-transcribe
 
-    `whisper-1` is the quickest model by far but it does not support async
-    output or prompting.
+    `whisper-1` is the quickest model by far but it does not support
+    streaming or prompting. For async output with it, the audio is split at
+    pauses and each part is transcribed at the same time.
 
     `gpt-4o-transcribe` is the best model, and matches `whisper-1` in terms of
     price, but may take longer to transcribe.
@@ -72,6 +141,11 @@ class OpenAIAudioTranscriber(AudioTranscriber):
      and is likely the slowest, but it will cost half the cost of the others.
 
      It's recommended that you choose either `whisper-1` or `gpt-4o-transcribe`.
+
+    If a cache folder is given, transcripts are saved there keyed by a hash of
+    the audio and the API parameters, so transcribing the same file again
+    doesn't call the API. Setting the `RPG_NO_TRANSCRIPT_CACHE` environment
+    variable to 1 turns this off.
     """
 
     def __init__(
@@ -80,15 +154,23 @@ class OpenAIAudioTranscriber(AudioTranscriber):
         model: str = "gpt-4o-transcribe",
         language: str = "en",
         extra_kwargs: Optional[dict] = None,
+        cache_folder: Optional[Path] = None,
+        max_parallel_requests: int = 4,
     ):
         """
         :param openai: OpenAI SDK client
         :param model: Name of model to use (default: "gpt-4o-transcribe")
         :param language: Language name, should be 2 character code (default: "en")
         :param extra_kwargs: Extra keyword arguments for transcription API call
+        :param cache_folder: Where to cache transcripts, None to not cache (see
+            `default_transcript_cache_folder`)
+        :param max_parallel_requests: How many parts of a split up file are
+            transcribed at once
         """
         self.openai = openai
         self.model = model
+        self.cache_folder: Optional[Path] = cache_folder
+        self.max_parallel_requests: int = max_parallel_requests
 
         self.language = language
         reserved_keys = {"model", "file", "language", "stream"}
@@ -116,26 +198,70 @@ class OpenAIAudioTranscriber(AudioTranscriber):
                 # TODO: Add branches for other model prompts
         self.transcription_kwargs.update(extra_kwargs)
 
+    def _cache_path(self, file: Path) -> Optional[Path]:
+        if self.cache_folder is None or os.environ.get(NO_CACHE_ENV) == "1":
+            return None
+        digest = hashlib.sha256()
+        digest.update(
+            json.dumps(self.transcription_kwargs, sort_keys=True, default=str).encode(
+                "utf-8"
+            )
+        )
+        with file.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return self.cache_folder / f"{digest.hexdigest()}.json"
+
+    @staticmethod
+    def _get_cached(path: Optional[Path]) -> Optional[str]:
+        if path is None:
+            return None
+        try:
+            return json.loads(path.read_bytes())["text"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @staticmethod
+    def _put_cached(path: Optional[Path], text: str):
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename so a partly written file is never read
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps({"text": text}), encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log.warning(f"Failed to cache transcript at {path}: {e}")
+
     @override
     def transcribe(self, file: Path) -> str:
         """Transcribe an audio file using the OpenAI Whisper API."""
         if not file.exists():
             raise FileNotFoundError(f"Audio file does not exist: {file}")
+        cache_path: Optional[Path] = self._cache_path(file)
+        cached: Optional[str] = self._get_cached(cache_path)
+        if cached is not None:
+            return cached
         try:
             with file.open("rb") as audio_fp:
                 response = self.openai.audio.transcriptions.create(
                     file=audio_fp,
                     **self.transcription_kwargs,
                 )
-            return response.text
         except Exception as e:
             raise RuntimeError(f"Transcription failed: {e}")
+        self._put_cached(cache_path, response.text)
+        return response.text
 
     @property
     @override
     def supports_async_out(self) -> bool:
-        """Whether async transcription is supported (streaming via OpenAI API)."""
-        return self.model != "whisper-1"
+        """
+        Async transcription is always supported, streamed from the OpenAI API
+        or by splitting up the audio for `whisper-1`
+        """
+        return True
 
     @override
     def transcribe_async_out(
@@ -145,10 +271,19 @@ class OpenAIAudioTranscriber(AudioTranscriber):
         Streams transcription chunks from the OpenAI API and calls the handler
         for each chunk.
         """
-        if self.model == "whisper-1":
-            raise ValueError("whisper-1 model does not support streaming")
         if not file.exists():
             raise FileNotFoundError(f"Audio file does not exist: {file}")
+        cache_path: Optional[Path] = self._cache_path(file)
+        cached: Optional[str] = self._get_cached(cache_path)
+        if cached is not None:
+            handler(file, cached, False)
+            handler(file, cached, True)
+            return
+        if self.model == "whisper-1":
+            # whisper-1 can't stream, so parts are transcribed separately
+            full_text = self._transcribe_segments(file, handler)
+            self._put_cached(cache_path, full_text)
+            return
         try:
             with file.open("rb") as audio_fp:
                 stream_kwargs = dict(self.transcription_kwargs)
@@ -170,6 +305,53 @@ class OpenAIAudioTranscriber(AudioTranscriber):
                 handler(file, full_text, True)
         except Exception as e:
             raise RuntimeError(f"Streaming transcription failed: {e}")
+        self._put_cached(cache_path, full_text)
+
+    def _transcribe_segments(
+        self, file: Path, handler: Callable[[Path, str, bool], None]
+    ) -> str:
+        segments: List[bytes] = self._segment_wav(file)
+
+        def transcribe_segment(wav: bytes) -> str:
+            response = self.openai.audio.transcriptions.create(
+                file=(file.name, wav), **self.transcription_kwargs
+            )
+            return response.text.strip()
+
+        full_text = ""
+        try:
+            with ThreadPoolExecutor(
+                max_workers=max(1, self.max_parallel_requests)
+            ) as executor:
+                # map yields in order, so text is handled as soon as every
+                # earlier part is done
+                for text in executor.map(transcribe_segment, segments):
+                    if not text:
+                        continue
+                    delta = f" {text}" if full_text else text
+                    full_text += delta
+                    handler(file, delta, False)
+        except Exception as e:
+            raise RuntimeError(f"Streaming transcription failed: {e}")
+        handler(file, full_text, True)
+        return full_text
+
+    @staticmethod
+    def _segment_wav(file: Path) -> List[bytes]:
+        """
+        Split an audio file at pauses into 16-bit WAV files held in memory.
+
+        If no speech is found the whole file is returned as one part.
+        """
+        samples, sample_rate = sf.read(file, dtype="int16", always_2d=True)
+        mono = samples.mean(axis=1) / 32768.0
+        regions = find_speech(mono, sample_rate) or [(0, len(samples))]
+        channels: int = samples.shape[1]
+        parts: List[bytes] = []
+        for start, end in regions:
+            pcm: bytes = samples[start:end].tobytes()
+            parts.append(wav_header(sample_rate, channels, 2, len(pcm)) + pcm)
+        return parts
 
 
 class DummyAudioTranscriber(AudioTranscriber):
@@ -193,16 +375,12 @@ class DummyAudioTranscriber(AudioTranscriber):
             self.dummy_text: List[str] = [dummy_text]
         else:
             self.dummy_text = [str(t) for t in dummy_text]
-        self._dummy_len: int = len(self.dummy_text)
-        if self._dummy_len <= 0:
+        if not self.dummy_text:
             raise ValueError("Must have at least 1 line of dummy text")
+        self._choice = self.random.choice
 
     def _random_text(self) -> str:
-        if self._dummy_len == 1:
-            return self.dummy_text[0]
-        else:
-            n = self.random.randint(0, self._dummy_len - 1)
-            return self.dummy_text[n]
+        return self._choice(self.dummy_text)
 
     @override
     def transcribe(self, file: Path) -> str:
@@ -217,10 +395,25 @@ class DummyAudioTranscriber(AudioTranscriber):
     def transcribe_async_out(
         self, file: Path, handler: Callable[[Path, str, bool], None]
     ):
+        """
+        Returns straight away, the lines are passed to the handler from a
+        background thread 0.2 seconds apart.
+        """
         line_count = self.random.randint(1, 3)
         seperator = "\n"
-        for _ in range(line_count):
-            time.sleep(0.2)
-            text = self._random_text() + seperator
-            handler(file, text, False)
-        handler(file, "", True)
+        # Picked here so the Random instance is only used from one thread
+        lines: List[str] = [self._random_text() + seperator for _ in range(line_count)]
+
+        def emit():
+            # Lines are scheduled from the start so slow handlers don't add
+            # drift
+            deadline = time.monotonic()
+            for text in lines:
+                deadline += 0.2
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                handler(file, text, False)
+            handler(file, "", True)
+
+        threading.Thread(target=emit, daemon=True).start()
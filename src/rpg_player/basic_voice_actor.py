@@ -1,6 +1,6 @@
 import logging
 from pathlib import Path
-from typing import Iterable, Set, Union
+from typing import FrozenSet, Iterable, Union
 
 import pyttsx3
 
@@ -16,16 +16,16 @@ class BasicVoiceActor(VoiceActor):
     """
 
     def __init__(self, names: Union[str, Iterable[str]]):
-        self.names = VoiceActor.parse_names(names)
+        self.names: FrozenSet[str] = VoiceActor.parse_names(names)
         self.engine = pyttsx3.init()
 
     @property
-    def speaker_names(self) -> Set[str]:
+    def speaker_names(self) -> FrozenSet[str]:
         return self.names
 
     def should_speak_message(self, message: ChatMessage) -> bool:
         return (
-            message.type == MessageType.SPEECH
+            message.type is MessageType.SPEECH
             and message.author.casefold() in self.names
         )
 
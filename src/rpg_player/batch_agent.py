@@ -0,0 +1,153 @@
+import json
+import logging
+import time
+from typing import Dict, List, Literal, Optional, Tuple, override
+
+from openai import OpenAI
+
+from .agent import OpenAIAgent
+from .chat_message import ChatMessage, ChatMessages
+
+BatchMode = Literal["interactive", "batch"]
+
+_FINISHED_STATUSES: frozenset[str] = frozenset(
+    {"completed", "failed", "expired", "cancelled"}
+)
+
+
+class BatchOpenAIAgent(OpenAIAgent):
+    """
+    An `OpenAIAgent` that can also queue requests for the OpenAI Batch API.
+
+    This is intended for non-interactive runs (simulations, evals, replays)
+    where responses are not needed straight away. Batched requests are
+    cheaper and avoid making one HTTP request per turn.
+
+    In "interactive" mode it behaves exactly like `OpenAIAgent`. In "batch"
+    mode `respond` is disabled; instead requests are queued with `add_task`
+    and sent together with `run_batch`, which returns the responses keyed by
+    the custom id given to each task.
+    """
+
+    def __init__(
+        self,
+        openai: OpenAI,
+        name: str,
+        system_prompt: str,
+        mode: BatchMode = "interactive",
+        poll_interval: float = 30.0,
+        **kwargs,
+    ):
+        """
+        :param mode: "interactive" to respond straight away, "batch" to queue
+        :param poll_interval: Seconds to wait between batch status checks
+        :param kwargs: Passed on to `OpenAIAgent`
+        """
+        super().__init__(openai, name, system_prompt, **kwargs)
+        self.mode: BatchMode = mode
+        self.poll_interval: float = poll_interval
+        self._tasks: List[Tuple[str, dict]] = []
+        self.log = logging.getLogger(f"BatchOpenAIAgent-{name}")
+
+    @override
+    def respond(self, messages: ChatMessages) -> ChatMessage:
+        if self.mode == "batch":
+            raise RuntimeError(
+                f"{self.name} is in batch mode, use add_task and run_batch"
+            )
+        return super().respond(messages)
+
+    @property
+    def pending_tasks(self) -> int:
+        return len(self._tasks)
+
+    def add_task(self, custom_id: str, messages: ChatMessages):
+        """
+        Queue a response to the given messages, to be sent with `run_batch`
+        """
+        if any(task_id == custom_id for task_id, _ in self._tasks):
+            raise ValueError(f"Duplicate custom_id: {custom_id}")
+        # Snapshot the messages, later appends must not change queued tasks
+        body = {"input": list(messages.as_openai), **self.response_kwargs}
+        self._tasks.append((custom_id, body))
+
+    def submit_batch(self) -> str:
+        """
+        Upload the queued tasks and create a batch for them.
+
+        The queue is cleared and the batch id is returned.
+        """
+        if not self._tasks:
+            raise ValueError("No tasks queued")
+        lines: List[str] = [
+            json.dumps(
+                {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/responses",
+                    "body": body,
+                }
+            )
+            for custom_id, body in self._tasks
+        ]
+        data: bytes = ("\n".join(lines) + "\n").encode("utf-8")
+        input_file = self.openai.files.create(
+            file=(f"{self.name}-batch.jsonl", data), purpose="batch"
+        )
+        batch = self.openai.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/responses",
+            completion_window="24h",
+        )
+        self.log.info("Submitted batch %s with %d tasks", batch.id, len(lines))
+        self._tasks.clear()
+        return batch.id
+
+    def wait_for_batch(self, batch_id: str) -> Dict[str, ChatMessage]:
+        """
+        Block until the batch has finished and return its responses.
+
+        Responses are keyed by custom id. Tasks that failed are left out and
+        logged.
+        """
+        batch = self.openai.batches.retrieve(batch_id)
+        while batch.status not in _FINISHED_STATUSES:
+            time.sleep(self.poll_interval)
+            batch = self.openai.batches.retrieve(batch_id)
+        if batch.status != "completed":
+            raise RuntimeError(f"Batch {batch_id} ended with status {batch.status}")
+        if batch.error_file_id:
+            self.log.warning("Batch %s had errors: %s", batch_id, batch.error_file_id)
+        results: Dict[str, ChatMessage] = {}
+        if not batch.output_file_id:
+            return results
+        content: str = self.openai.files.content(batch.output_file_id).text
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            row: dict = json.loads(line)
+            custom_id: str = row["custom_id"]
+            response: Optional[dict] = row.get("response")
+            if row.get("error") or not response or response["status_code"] != 200:
+                self.log.warning("Task %s failed: %s", custom_id, row.get("error"))
+                continue
+            text: str = _extract_batch_text(response["body"])
+            results[custom_id] = ChatMessage.speech(self.name, text)
+        return results
+
+    def run_batch(self) -> Dict[str, ChatMessage]:
+        """
+        Submit the queued tasks and wait for the responses
+        """
+        return self.wait_for_batch(self.submit_batch())
+
+
+def _extract_batch_text(body: dict) -> str:
+    # Batch output is plain JSON rather than SDK objects
+    collected: List[str] = []
+    for item in body.get("output") or []:
+        if item.get("type") == "message":
+            for block in item.get("content") or []:
+                if block.get("type") == "output_text" and block.get("text"):
+                    collected.append(block["text"])
+    return "\n".join(collected).strip()
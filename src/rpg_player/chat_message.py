@@ -1,9 +1,11 @@
 import enum
-import json
-import uuid
+import os
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterable, Iterator, List, Optional
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from . import fast_json
 
 
 class MessageType(enum.Enum):
@@ -24,30 +26,44 @@ class MessageType(enum.Enum):
     SUMMARY = "summary"
 
 
-@dataclass
+def new_message_id() -> str:
+    """
+    Create a new random message ID.
+
+    These are 32 hex characters. Older messages use hyphenated UUIDs instead,
+    IDs are only ever compared so both are fine.
+    """
+    return os.urandom(16).hex()
+
+
+# Summaries from these authors are treated as user messages
+_NARRATORS: frozenset[str] = frozenset({"DM", "GM"})
+# Looking up a dict is quicker than the Enum value property
+_TYPE_VALUES: dict[MessageType, str] = {t: t.value for t in MessageType}
+
+
+@dataclass(slots=True)
 class ChatMessage:
-    msg_id: str = field(
-        default_factory=lambda: str(uuid.uuid4())
-    )  # A unique ID for the message
+    msg_id: str = field(default_factory=new_message_id)  # A unique ID for the message
     author: str = ""  # The author of the message
     type: MessageType = MessageType.SPEECH  # The message type
     content: str = ""  # The content of the message, should be plain text
 
     @classmethod
     def speech(cls, author: str, content: str) -> "ChatMessage":
-        return cls(str(uuid.uuid4()), author, MessageType.SPEECH, content)
+        return cls(author=author, type=MessageType.SPEECH, content=content)
 
     @classmethod
     def narration(cls, author: str, content: str) -> "ChatMessage":
-        return cls(str(uuid.uuid4()), author, MessageType.NARRATION, content)
+        return cls(author=author, type=MessageType.NARRATION, content=content)
 
     @classmethod
     def system(cls, author: str, content: str) -> "ChatMessage":
-        return cls(str(uuid.uuid4()), author, MessageType.SYSTEM, content)
+        return cls(author=author, type=MessageType.SYSTEM, content=content)
 
     @classmethod
     def summary(cls, author: str, content: str) -> "ChatMessage":
-        return cls(str(uuid.uuid4()), author, MessageType.SUMMARY, content)
+        return cls(author=author, type=MessageType.SUMMARY, content=content)
 
     @staticmethod
     def from_dict(d: dict) -> "ChatMessage":
@@ -59,16 +75,43 @@ class ChatMessage:
         return {
             "msg_id": self.msg_id,
             "author": self.author,
-            "type": self.type.value,
+            "type": _TYPE_VALUES[self.type],
             "content": self.content,
         }
 
 
+@lru_cache(maxsize=1024)
+def _openai_message(role: str, content: str) -> dict[str, str]:
+    # Repeated messages share one dict, they are never modified
+    return {"role": role, "content": content}
+
+
+def _openai_converter(role: str) -> Callable[[ChatMessage], dict[str, str]]:
+    def convert(message: ChatMessage) -> dict[str, str]:
+        return _openai_message(role, f"{message.author}: {message.content}")
+
+    return convert
+
+
+_convert_assistant = _openai_converter("assistant")
+_convert_user = _openai_converter("user")
+
+
+def _convert_summary(message: ChatMessage) -> dict[str, str]:
+    if message.author in _NARRATORS:
+        return _convert_user(message)
+    return _convert_assistant(message)
+
+
 class ChatMessages:
     """
     Container class for messages.
 
     This will contain all messages sent during a session.
+
+    Messages should only ever be appended. Keeping earlier messages unchanged
+    and in order means each request shares its prefix with the last one,
+    which is what LLM prompt caching relies on.
     """
 
     def convert_to_openai(self, message: ChatMessage) -> dict[str, str]:
@@ -82,20 +125,7 @@ class ChatMessages:
         this is "system" but it could be "developer" or anything else depending
         on the models used.
         """
-        msg_author: str = message.author
-        role = "assistant"
-        match message.type:
-            case MessageType.SPEECH:
-                role = "assistant"
-            case MessageType.NARRATION:
-                role = "user"
-            case MessageType.SYSTEM:
-                role = self.system_role
-            case MessageType.SUMMARY:
-                role = "assistant"
-                if msg_author == "DM" or msg_author == "GM":
-                    role = "user"
-        return {"role": role, "content": f"{msg_author}: {message.content}"}
+        return self._converters[message.type](message)
 
     @staticmethod
     def load_messages_from_file(file: Path) -> List[ChatMessage]:
@@ -107,20 +137,28 @@ class ChatMessages:
         """
         if not file.exists():
             return []
-        loaded_messages: List[ChatMessage] = []
-        with open(file, "r") as f:
-            for line in f:
-                trimmed = line.strip()
-                entry = json.loads(trimmed)
-                message: ChatMessage = ChatMessage.from_dict(entry)
-                loaded_messages.append(message)
-        return loaded_messages
+        # Read in one go and parse with orjson when it is installed
+        data: bytes = file.read_bytes()
+        return [
+            ChatMessage.from_dict(fast_json.loads(line))
+            for line in data.splitlines()
+            if line.strip()
+        ]
 
     def __init__(self, system_role: str = "developer"):
         self.system_role: str = system_role
+        # One converter per message type, each with its role baked in
+        self._converters: dict[MessageType, Callable[[ChatMessage], dict]] = {
+            MessageType.SPEECH: _convert_assistant,
+            MessageType.NARRATION: _convert_user,
+            MessageType.SYSTEM: _openai_converter(system_role),
+            MessageType.SUMMARY: _convert_summary,
+        }
         self.messages: List[ChatMessage] = []
         # This is to cache the creation of OpenAI style messages
         self._openai_messages: List[dict] = []
+        # The type of each message, kept alongside for quick filtering
+        self._types: List[MessageType] = []
 
     def __len__(self) -> int:
         return len(self.messages)
@@ -129,28 +167,33 @@ class ChatMessages:
         return iter(self.messages)
 
     def __getitem__(self, idx):
-        if isinstance(idx, slice):
-            return list(self.messages)[idx]
-        return list(self.messages)[idx]
+        return self.messages[idx]
 
     def append(self, message: ChatMessage):
         self.messages.append(message)
-        openai_msg = self.convert_to_openai(message)
+        self._types.append(message.type)
+        openai_msg = self._converters[message.type](message)
         self._openai_messages.append(openai_msg)
 
     def extend(self, messages: Iterable[ChatMessage]):
-        for message in messages:
-            self.append(message)
+        msgs: List[ChatMessage] = list(messages)
+        convert = self.convert_to_openai
+        self.messages.extend(msgs)
+        self._types.extend([message.type for message in msgs])
+        self._openai_messages.extend([convert(message) for message in msgs])
 
     def filter_type(self, msg_type: MessageType) -> List[ChatMessage]:
-        msgs: List[ChatMessage] = []
-        for message in self.messages:
-            if message.type == msg_type:
-                msgs.append(message)
-        return msgs
+        return [m for m, t in zip(self.messages, self._types) if t is msg_type]
 
     @property
     def as_openai(self) -> List[dict]:
+        """
+        The messages in OpenAI format.
+
+        This list is built up as messages are appended rather than on each
+        access, and identical messages share the same dict, so callers should
+        treat it and its contents as read-only.
+        """
         return self._openai_messages
 
     @property
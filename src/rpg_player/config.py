@@ -1,49 +1,84 @@
-import json
+from __future__ import annotations
+
 import logging
 import tomllib
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
 
-from elevenlabs.client import ElevenLabs
+import httpx
 from openai import OpenAI
 
+from . import fast_json
 from .agent import Agent, OpenAIAgent
-from .basic_voice_actor import BasicVoiceActor
-from .elevenlabs_voice_actor import ElevenlabsVoiceActor
-from .openai_voice_actor import OpenAIVoiceActor
-from .piper_voice_actor import PiperVoiceActor
 from .prompt_parser import PromptParser
 from .voice_actor import VoiceActor
 
+# The voice actor SDKs are slow to import, so they are only imported when an
+# actor that needs them is created
+if TYPE_CHECKING:
+    from elevenlabs.client import ElevenLabs
+
+    from .basic_voice_actor import BasicVoiceActor
+    from .elevenlabs_voice_actor import ElevenlabsVoiceActor
+    from .openai_voice_actor import OpenAIVoiceActor
+    from .piper_voice_actor import PiperVoiceActor
+
 
 @dataclass
 class APIKeys:
     openai: Optional[str] = None
     elevenlabs: Optional[str] = None
+    _openai_client: Optional[OpenAI] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _elevenlabs_client: Optional[ElevenLabs] = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     def get_openai_client(self) -> OpenAI:
         """
-        Get an OpenAI client from the configuration or environment
+        Get an OpenAI client from the configuration or environment.
+
+        The client is created once and then reused, so everything using it
+        shares the same connection pool.
         """
+        if self._openai_client is not None:
+            return self._openai_client
         if self.openai:
-            return OpenAI(api_key=self.openai)
+            self._openai_client = OpenAI(api_key=self.openai)
         else:
             log = logging.getLogger(__name__)
             log.warning("Using OpenAI Key from environment")
-            return OpenAI()
+            self._openai_client = OpenAI()
+        return self._openai_client
 
     def get_elevenlabs_client(self) -> ElevenLabs:
         """
         Get an Elevenlabs client using the config or environment for the API
-        key
+        key.
+
+        As with OpenAI, the client is created once and reused so its
+        connections are kept alive between requests.
         """
+        if self._elevenlabs_client is not None:
+            return self._elevenlabs_client
+        from elevenlabs.client import ElevenLabs
+
+        httpx_client = httpx.Client(
+            limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=60.0),
+            timeout=240,
+        )
         if self.elevenlabs:
-            return ElevenLabs(api_key=self.elevenlabs)
+            self._elevenlabs_client = ElevenLabs(
+                api_key=self.elevenlabs, httpx_client=httpx_client
+            )
         else:
             log = logging.getLogger(__name__)
             log.warning("Using ElevenLabs Key from environment")
-            return ElevenLabs()
+            self._elevenlabs_client = ElevenLabs(httpx_client=httpx_client)
+        return self._elevenlabs_client
 
 
 @dataclass
@@ -88,7 +123,14 @@ class AgentConfig:
         )
 
         return OpenAIAgent(
-            openai_client, self.name, prompt_text, model, extra_kwargs=extra_kwargs
+            openai_client,
+            self.name,
+            prompt_text,
+            model,
+            extra_kwargs=extra_kwargs,
+            async_openai=kwargs.get("async_openai"),
+            response_cache=kwargs.get("response_cache"),
+            rate_limiter=kwargs.get("rate_limiter"),
         )
 
 
@@ -98,24 +140,36 @@ class VoiceActorConfig:
     speakers: List[str]
     args: dict
 
-    def create_actor(self, api_keys: Optional[APIKeys]) -> VoiceActor:
+    def create_actor(
+        self, api_keys: Optional[APIKeys], openai: Optional[OpenAI] = None
+    ) -> VoiceActor:
+        """
+        Create the configured voice actor.
+
+        If an OpenAI client is given it will be used instead of creating a new
+        one, so agents and actors can share connections.
+        """
         match self.type.casefold():
             case "piper":
                 return self._create_piper_actor()
             case "elevenlabs":
                 return self._create_elevenlabs_actor(api_keys)
             case "openai":
-                return self._create_openai_actor(api_keys)
+                return self._create_openai_actor(api_keys, openai)
             case "basic":
                 return self._create_basic_actor()
         raise NotImplementedError(f"Not implemented for type: {self.type}")
 
     def _create_piper_actor(self) -> PiperVoiceActor:
+        from .piper_voice_actor import PiperVoiceActor
+        from .tts_cache import TTSCache
+
         args: dict = self.args
         model_path: str = args.get("model_path")
         if not model_path:
             raise ValueError("Missing 'model_path' from args")
-        actor = PiperVoiceActor(self.speakers, Path(model_path))
+        tts_cache: Optional[TTSCache] = TTSCache() if args.get("cache") else None
+        actor = PiperVoiceActor(self.speakers, Path(model_path), tts_cache=tts_cache)
         speaker_ids: Dict[str, int] = args.get("speaker_ids", {})
         for name, speaker_id in speaker_ids.items():
             actor.set_speaker_id_for(name, speaker_id)
@@ -124,6 +178,11 @@ class VoiceActorConfig:
     def _create_elevenlabs_actor(
         self, api_keys: Optional[APIKeys]
     ) -> ElevenlabsVoiceActor:
+        from elevenlabs.client import ElevenLabs
+
+        from .elevenlabs_voice_actor import ElevenlabsVoiceActor
+        from .tts_cache import TTSCache
+
         client: ElevenLabs = None
         if api_keys:
             client = api_keys.get_elevenlabs_client()
@@ -133,24 +192,44 @@ class VoiceActorConfig:
         voice_id: Optional[str] = args.get("voice_id")
         if not voice_id:
             raise ValueError("Missing 'voice_id' from args")
-        model_id: Optional[str] = args.get("model_id")
-        if not model_id:
-            return ElevenlabsVoiceActor(self.speakers, client, voice_id)
-        else:
-            return ElevenlabsVoiceActor(
-                self.speakers, client, voice_id, model_id=model_id
+        tts_cache: Optional[TTSCache] = None
+        if args.get("cache"):
+            tts_cache = TTSCache(ttl=args.get("cache_ttl"))
+        # Optional settings are only passed on when given, so the actor's
+        # defaults apply otherwise
+        optional: dict = {
+            k: args[k]
+            for k in (
+                "model_id",
+                "output_format",
+                "live_latency_opt",
+                "file_latency_opt",
+                "max_parallel_requests",
+                "prefill_ms",
+                "blocksize",
             )
+            if args.get(k) is not None
+        }
+        return ElevenlabsVoiceActor(
+            self.speakers, client, voice_id, tts_cache=tts_cache, **optional
+        )
 
-    def _create_openai_actor(self, api_keys: Optional[APIKeys]) -> OpenAIVoiceActor:
-        client: OpenAI = None
-        if api_keys:
-            client = api_keys.get_openai_client()
-        else:
-            client = OpenAI()
+    def _create_openai_actor(
+        self, api_keys: Optional[APIKeys], client: Optional[OpenAI] = None
+    ) -> OpenAIVoiceActor:
+        from .openai_voice_actor import OpenAIVoiceActor
+
+        if client is None:
+            if api_keys:
+                client = api_keys.get_openai_client()
+            else:
+                client = OpenAI()
         args: dict = self.args
         return OpenAIVoiceActor(self.speakers, client, **args)
 
     def _create_basic_actor(self) -> BasicVoiceActor:
+        from .basic_voice_actor import BasicVoiceActor
+
         return BasicVoiceActor(self.speakers)
 
 
@@ -166,6 +245,7 @@ class Config:
     agents: List[AgentConfig] = field(default_factory=list)
     voice_actors: List[VoiceActorConfig] = field(default_factory=list)
     text_chat_path: Optional[Path] = None
+    response_cache_path: Optional[Path] = None
 
     @staticmethod
     def from_dict(data: dict) -> "Config":
@@ -192,14 +272,14 @@ class Config:
                 name=d["name"],
                 prompt_path=Path(d["prompt_path"]),
                 type=d["type"],
-                args=dict(d.get("args", {})),
+                args=d.get("args") or {},
             )
 
         def parse_voice_actor(d: dict) -> VoiceActorConfig:
             return VoiceActorConfig(
                 type=d["type"],
-                speakers=list(d.get("speakers", [])),
-                args=dict(d.get("args", {})),
+                speakers=d.get("speakers") or [],
+                args=d.get("args") or {},
             )
 
         return Config(
@@ -213,24 +293,35 @@ class Config:
             agents=[parse_agent(agent) for agent in data.get("agents", [])],
             voice_actors=[parse_voice_actor(v) for v in data.get("voice_actors", [])],
             text_chat_path=path_or_none(data.get("text_chat_path")),
+            response_cache_path=path_or_none(data.get("response_cache_path")),
         )
 
     @staticmethod
     def from_path(path: Union[Path, str]) -> "Config":
         """
-        Load configuration from a given path
+        Load configuration from a given path.
+
+        Loaded configs are cached until the file changes, so the same `Config`
+        instance is returned for repeated loads and should not be modified.
         """
         if isinstance(path, str):
-            path = Path(str)
+            path = Path(path)
         if not path.exists():
             raise ValueError(f"path does not exist: {path}")
         if not path.is_file():
             raise ValueError(f"path is not a file: {path}")
-        extension: str = path.suffix.casefold()
-        match extension:
-            case ".json":
-                return Config.from_dict(json.loads(path.read_text()))
-            case ".toml":
-                return Config.from_dict(tomllib.loads(path.read_text()))
-
-        raise ValueError(f"path was not a valid config file: {path}")
+        stat = path.stat()
+        return _load_config(path.resolve(), stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=8)
+def _load_config(path: Path, mtime_ns: int, size: int) -> Config:
+    # mtime and size are part of the key so edited configs are read again
+    extension: str = path.suffix.casefold()
+    match extension:
+        case ".json":
+            return Config.from_dict(fast_json.loads(path.read_bytes()))
+        case ".toml":
+            return Config.from_dict(tomllib.loads(path.read_text()))
+
+    raise ValueError(f"path was not a valid config file: {path}")
@@ -1,25 +1,43 @@
 import logging
 import os
-import tempfile
-import wave
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterable, Set, Union, override
+from typing import FrozenSet, Iterable, Iterator, List, Optional, Union, override
 
-import sounddevice as sd
 from elevenlabs.client import ElevenLabs
 
+from .audio_player import play_pcm_stream, play_wav_bytes
 from .chat_message import ChatMessage, MessageType
+from .sentences import split_sentences
+from .tts_cache import TTSCache, pcm_to_wav
 from .voice_actor import VoiceActor
+from .wav_writer import RawWavWriter, silence_wav
 
 log = logging.getLogger(__name__)
 
 
+def pcm_sample_rate(output_format: str) -> int:
+    """
+    The sample rate of an ElevenLabs PCM output format, like "pcm_16000"
+    """
+    kind, _, rate = output_format.partition("_")
+    if kind != "pcm" or not rate.isdigit():
+        raise ValueError(f"Not a PCM output format: {output_format}")
+    return int(rate)
+
+
 class ElevenlabsVoiceActor(VoiceActor):
     """
     Voice Actor that uses Elevenlabs.io voices.
 
     You'll need to have an Elevenlabs client setup for this and reference the
     right voice_id (these can be copied from the platform).
+
+    The client should be shared between actors rather than created per
+    actor or per request, so connections to the API are reused.
+
+    If a `TTSCache` is given, lines that have been spoken before are taken
+    from it instead of calling the API again.
     """
 
     def __init__(
@@ -28,11 +46,39 @@ class ElevenlabsVoiceActor(VoiceActor):
         elevenlabs: ElevenLabs,
         voice_id: str,
         model_id: str = "eleven_flash_v2_5",
+        tts_cache: Optional[TTSCache] = None,
+        output_format: str = "pcm_16000",
+        live_latency_opt: int = 3,
+        file_latency_opt: int = 2,
+        max_parallel_requests: int = 3,
+        prefill_ms: int = 200,
+        blocksize: int = 1024,
     ):
-        self.names: Set[str] = VoiceActor.parse_names(names)
+        """
+        :param output_format: An ElevenLabs PCM output format, e.g.
+            "pcm_24000"
+        :param live_latency_opt: `optimize_streaming_latency` when speaking
+            out loud, higher values start speaking sooner
+        :param file_latency_opt: `optimize_streaming_latency` when saving to a
+            file, where only the total time matters
+        :param max_parallel_requests: How many sentences of a long message are
+            synthesized at once when saving to a file
+        :param prefill_ms: Milliseconds of audio buffered before speaking out
+            loud starts, to ride out gaps in the network stream
+        :param blocksize: Frames per audio callback when speaking out loud
+        """
+        self.names: FrozenSet[str] = VoiceActor.parse_names(names)
         self.elevenlabs: ElevenLabs = elevenlabs
         self.voice_id: str = voice_id
         self.model_id: str = model_id
+        self.tts_cache: Optional[TTSCache] = tts_cache
+        self.output_format: str = output_format
+        self.sample_rate: int = pcm_sample_rate(output_format)
+        self.live_latency_opt: int = live_latency_opt
+        self.file_latency_opt: int = file_latency_opt
+        self.max_parallel_requests: int = max_parallel_requests
+        self.prefill_ms: int = prefill_ms
+        self.blocksize: int = blocksize
 
     @override
     def speak_message(self, message: ChatMessage, folder_path: Path) -> Path:
@@ -41,35 +87,38 @@ class ElevenlabsVoiceActor(VoiceActor):
         )
         folder_path.mkdir(parents=True, exist_ok=True)
 
-        # 16kHz PCM hard coded for now
-        output_file_format: str = "pcm_16000"
+        output_file_format: str = self.output_format
         # We'll be writing out to a WAV file for now
-        suffix = ".wav"
-        out_path = None
-        with tempfile.NamedTemporaryFile(
-            dir=folder_path, suffix=suffix, delete=False
-        ) as f:
-            out_path = Path(f.name)
+        out_path: Path = self.new_output_path(folder_path, ".wav")
 
         text = (message.content or "").strip()
+        if not text:
+            # Nothing to say, so don't pay for an API call
+            out_path.write_bytes(silence_wav(self.sample_rate))
+            return out_path
+        cached: Optional[bytes] = self._get_cached(text, output_file_format)
+        if cached is not None:
+            out_path.write_bytes(cached)
+            return out_path
 
+        self._synthesize_to(out_path, text)
+        if self.tts_cache:
+            self._put_cached(text, output_file_format, out_path.read_bytes())
+        return out_path
+
+    def _synthesize_to(self, out_path: Path, text: str) -> None:
         try:
-            # Call the ElevenLabs streaming convert API and write chunks to file.
-            response = self.elevenlabs.text_to_speech.convert(
-                voice_id=self.voice_id,
-                text=text,
-                output_format=output_file_format,
-                model_id=self.model_id,
-                optimize_streaming_latency=2,
-            )
-            with wave.open(str(out_path), "wb") as f:
-                f.setnchannels(1)
-                f.setsampwidth(2)
-                f.setframerate(16000)
-                for chunk in response:
-                    if chunk:
-                        f.writeframes(chunk)
-            return out_path
+            sentences: List[str] = split_sentences(text, min_length=40)
+            with RawWavWriter(out_path, self.sample_rate) as writer:
+                if len(sentences) <= 1:
+                    # Call the ElevenLabs streaming convert API and write
+                    # chunks to file.
+                    for chunk in self._convert(text):
+                        if chunk:
+                            writer.write(chunk)
+                else:
+                    for pcm in self._convert_sentences(sentences):
+                        writer.write(pcm)
         except Exception:
             # Cleanup on failure
             try:
@@ -80,15 +129,69 @@ class ElevenlabsVoiceActor(VoiceActor):
                 pass
             raise
 
+    def _convert(
+        self,
+        text: str,
+        previous_text: Optional[str] = None,
+        next_text: Optional[str] = None,
+    ) -> Iterator[bytes]:
+        extra: dict = {}
+        if previous_text:
+            extra["previous_text"] = previous_text
+        if next_text:
+            extra["next_text"] = next_text
+        return self.elevenlabs.text_to_speech.convert(
+            voice_id=self.voice_id,
+            text=text,
+            output_format=self.output_format,
+            model_id=self.model_id,
+            optimize_streaming_latency=self.file_latency_opt,
+            **extra,
+        )
+
+    def _convert_sentences(self, sentences: List[str]) -> Iterator[bytes]:
+        """
+        Synthesize sentences in parallel, yielding their audio in order.
+
+        The neighbouring sentences are sent with each request so the speech
+        still flows between them.
+        """
+
+        def convert(i: int) -> bytes:
+            previous_text = sentences[i - 1] if i > 0 else None
+            next_text = sentences[i + 1] if i + 1 < len(sentences) else None
+            return b"".join(self._convert(sentences[i], previous_text, next_text))
+
+        workers: int = max(1, min(self.max_parallel_requests, len(sentences)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(convert, i) for i in range(len(sentences))]
+            try:
+                for future in futures:
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    @override
+    def warm(self) -> None:
+        # Looking up the voice is free and opens a connection (DNS and TLS)
+        # ready for the first real request
+        try:
+            self.elevenlabs.voices.get(self.voice_id)
+        except Exception as e:
+            log.warning(f"Failed to warm up ElevenLabs voice {self.voice_id}: {e}")
+
     @override
     def should_speak_message(self, message: ChatMessage) -> bool:
-        return (message.author.casefold() in self.names) and (
-            message.type == MessageType.SPEECH
+        # The type check is cheaper so is done first
+        return (
+            message.type is MessageType.SPEECH
+            and message.author.casefold() in self.names
         )
 
     @property
     @override
-    def speaker_names(self) -> Set[str]:
+    def speaker_names(self) -> FrozenSet[str]:
         return self.names
 
     @property
@@ -102,17 +205,50 @@ class ElevenlabsVoiceActor(VoiceActor):
             f"Speaking message {message.msg_id} with ElevenLabs (voice={self.voice_id})"
         )
         text = (message.content or "").strip()
-        output_file_format: str = "pcm_16000"
+        if not text:
+            return
+        output_file_format: str = self.output_format
+        cached: Optional[bytes] = self._get_cached(text, output_file_format)
+        if cached is not None:
+            play_wav_bytes(cached)
+            return
         audio = self.elevenlabs.text_to_speech.stream(
             voice_id=self.voice_id,
             model_id=self.model_id,
             output_format=output_file_format,
             text=text,
-            optimize_streaming_latency=2,
+            optimize_streaming_latency=self.live_latency_opt,
         )
-        with sd.RawOutputStream(
-            samplerate=16000, channels=1, dtype="int16", blocksize=512, latency="low"
-        ) as out:
+        played: list[bytes] = []
+
+        def received() -> Iterator[bytes]:
             for chunk in audio:
                 if chunk:
-                    out.write(chunk)
+                    played.append(chunk)
+                    yield chunk
+
+        # Chunks are received on another thread while earlier ones play
+        play_pcm_stream(
+            received(),
+            self.sample_rate,
+            blocksize=self.blocksize,
+            prefill_ms=self.prefill_ms,
+        )
+        if self.tts_cache:
+            wav: bytes = pcm_to_wav(b"".join(played), self.sample_rate)
+            self._put_cached(text, output_file_format, wav)
+
+    def _cache_key(self, text: str, output_format: str) -> str:
+        return TTSCache.make_key(self.model_id, output_format, text)
+
+    def _get_cached(self, text: str, output_format: str) -> Optional[bytes]:
+        if not self.tts_cache or not text:
+            return None
+        key: str = self._cache_key(text, output_format)
+        cached = self.tts_cache.get(f"elevenlabs-{self.voice_id}", key)
+        log.debug(f"TTS cache {'hit' if cached is not None else 'miss'} for {key}")
+        return cached
+
+    def _put_cached(self, text: str, output_format: str, wav: bytes):
+        key: str = self._cache_key(text, output_format)
+        self.tts_cache.put(f"elevenlabs-{self.voice_id}", key, wav)
@@ -0,0 +1,18 @@
+import json
+from typing import Any, Union
+
+# orjson is optional, it is much quicker at parsing but the standard library is
+# fine for small files
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    Parse JSON from bytes or a string, using orjson if it is installed
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
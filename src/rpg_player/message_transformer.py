@@ -1,9 +1,16 @@
+import hashlib
+import os
 from abc import ABC, abstractmethod
-from typing import Iterable, override
+from typing import Callable, Iterable, Optional, Tuple, override
 
 from openai import OpenAI
 
 from .chat_message import ChatMessage
+from .response_cache import ResponseCache
+from .response_text import extract_output_text
+
+# Seconds cached audio tag responses stay valid for, unset means an hour
+TAG_CACHE_TTL_ENV: str = "RPG_TAG_CACHE_TTL"
 
 
 class ChatMessageTransformer(ABC):
@@ -35,17 +42,27 @@ class SequentialMessageTransformer(ChatMessageTransformer):
     """
     A message transformer that will apply multiple other transformers in
     sequence
+
+    The steps are worked out once on construction, nested sequences are
+    flattened and no-op transformers are skipped.
     """
 
     def __init__(self, transformers: Iterable[ChatMessageTransformer]) -> None:
-        self.transformers: list[ChatMessageTransformer] = list(transformers)
+        self.transformers: Tuple[ChatMessageTransformer, ...] = tuple(transformers)
+        steps: list[Callable[[ChatMessage], ChatMessage]] = []
+        for transformer in self.transformers:
+            if isinstance(transformer, SequentialMessageTransformer):
+                steps.extend(transformer._steps)
+            elif not isinstance(transformer, NoOpMessageTranformer):
+                steps.append(transformer.transform)
+        # Bound methods, so each message is just a chain of direct calls
+        self._steps: Tuple[Callable[[ChatMessage], ChatMessage], ...] = tuple(steps)
 
     @override
     def transform(self, message: ChatMessage) -> ChatMessage:
-        response: ChatMessage = message
-        for transformer in self.transformers:
-            response = transformer.transform(response)
-        return response
+        for step in self._steps:
+            message = step(message)
+        return message
 
 
 class RemovePrefixMessageTransformer(ChatMessageTransformer):
@@ -56,9 +73,11 @@ class RemovePrefixMessageTransformer(ChatMessageTransformer):
 
     @override
     def transform(self, message: ChatMessage) -> ChatMessage:
-        prefix: str = f"{message.author}:"
-        if message.content.startswith(prefix):
-            message.content = (message.content[len(prefix) :]).strip()
+        content: str = message.content
+        # removeprefix hands back the same string when there is no prefix
+        trimmed: str = content.removeprefix(message.author + ":")
+        if trimmed is not content:
+            message.content = trimmed.strip()
         return message
 
 
@@ -184,9 +203,28 @@ Use these as a guide. You can infer similar, contextually appropriate **audio ta
 """.strip()  # noqa
     )
 
-    def __init__(self, openai: OpenAI, model: str = "gpt-5-nano") -> None:
+    def __init__(
+        self,
+        openai: OpenAI,
+        model: str = "gpt-5-nano",
+        response_cache: Optional[ResponseCache] = None,
+    ) -> None:
+        """
+        :param response_cache: Cache of tagged text, so the same text isn't
+            sent twice. Defaults to an in-memory cache whose TTL can be set
+            with the `RPG_TAG_CACHE_TTL` environment variable. Pass a
+            `SqliteResponseCache` to keep them between runs.
+        """
         self.openai: OpenAI = openai
         self.model: str = model
+        if response_cache is None:
+            ttl: Optional[str] = os.environ.get(TAG_CACHE_TTL_ENV)
+            response_cache = ResponseCache(ttl=float(ttl) if ttl else 3600.0)
+        self.response_cache: ResponseCache = response_cache
+        # The prompt never changes, so it is hashed once for the cache keys
+        self._prompt_hash: str = hashlib.sha256(
+            AddElevenlabsAudioTagsTransformer.PROMPT.encode("utf-8")
+        ).hexdigest()
 
     @override
     def transform(self, message: ChatMessage) -> ChatMessage:
@@ -195,25 +233,20 @@ Use these as a guide. You can infer similar, contextually appropriate **audio ta
         return message
 
     def _get_response(self, text: str) -> str:
+        key: str = ResponseCache.make_key(
+            {"model": self.model, "prompt": self._prompt_hash, "input": text}
+        )
+        cached: Optional[str] = self.response_cache.get(key)
+        if cached is not None:
+            return cached
+
         response = self.openai.responses.create(
             input=text,
             instructions=AddElevenlabsAudioTagsTransformer.PROMPT,
             model=self.model,
         )
 
-        # Depending on model the output can be slightly different
-        output = getattr(response, "output", None) or []
-        collected: list[str] = []
-        for item in output:
-            if getattr(item, "type", None) != "message":
-                continue
-            # item.content is a list of blocks
-            for block in getattr(item, "content", []) or []:
-                if getattr(block, "type", None) == "output_text":
-                    txt = getattr(block, "text", "") or ""
-                    if txt:
-                        collected.append(txt)
-        if collected:
-            return "\n".join(collected).strip()
-        # Fallback to output_text
-        return (getattr(response, "output_text", "") or "").strip()
+        output_text: str = extract_output_text(response)
+        if output_text:
+            self.response_cache.put(key, output_text)
+        return output_text
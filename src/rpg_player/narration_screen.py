@@ -4,7 +4,7 @@ import asyncio
 import tempfile
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 from rich.markdown import Markdown
 from textual import on
@@ -14,9 +14,11 @@ from textual.screen import Screen
 from textual.widgets import Button, Footer, Header, Label, RichLog, TextArea
 
 from .audio_recorder import AudioRecorder, SoundDeviceRecorder
-from .audio_transcriber import AudioTranscriber
 from .chat_message import ChatMessages
 
+if TYPE_CHECKING:
+    from .audio_transcriber import AudioTranscriber
+
 
 @dataclass
 class TranscriptionChunk:
@@ -207,13 +209,13 @@ class NarrationScreen(Screen):
 
     async def _append_transcription(self, chunk: TranscriptionChunk) -> None:
         editor = self.query_one(TextArea)
-        current = editor.text or ""
-        if chunk.is_done and current == "":
+        end = editor.document.end
+        if chunk.is_done and end == (0, 0):
             # replace all text with final output
             editor.text = chunk.text
         elif not chunk.is_done:
-            # append text
-            editor.text = f"{current}{chunk.text}"
+            # append text in place rather than rebuilding the whole document
+            editor.insert(chunk.text, location=end)
         editor.cursor_location = (
             editor.document.end
         )  # move caret to end; TextArea auto-scrolls when cursor/selection changes
@@ -251,17 +253,21 @@ class NarrationScreen(Screen):
     def action_cancel(self) -> None:
         self.dismiss(None)
 
-    @on(Button.Pressed)
-    async def handle_button_pressed(self, event: Button.Pressed) -> None:
-        bid = event.button.id
-        if bid == "btn-record":
-            await self.action_toggle_record()
-        elif bid == "btn-accept":
-            self.action_accept()
-        elif bid == "btn-cancel":
-            self.action_cancel()
-        elif bid == "btn-clear":
-            self.action_clear()
+    @on(Button.Pressed, "#btn-record")
+    async def handle_record(self, _: Button.Pressed) -> None:
+        await self.action_toggle_record()
+
+    @on(Button.Pressed, "#btn-accept")
+    def handle_accept(self, _: Button.Pressed) -> None:
+        self.action_accept()
+
+    @on(Button.Pressed, "#btn-cancel")
+    def handle_cancel(self, _: Button.Pressed) -> None:
+        self.action_cancel()
+
+    @on(Button.Pressed, "#btn-clear")
+    def handle_clear(self, _: Button.Pressed) -> None:
+        self.action_clear()
 
     def _set_status(self, text: str) -> None:
         self.query_one("#status", Label).update(text)
@@ -1,10 +1,9 @@
 import asyncio
 import logging
 import os
-import tempfile
 import threading
 from pathlib import Path
-from typing import Iterable, Optional, Set, Union
+from typing import FrozenSet, Iterable, Optional, Union
 
 from openai import AsyncOpenAI, OpenAI
 from openai.helpers import LocalAudioPlayer
@@ -47,7 +46,7 @@ class OpenAIVoiceActor(VoiceActor):
         response_format: str = "wav",
         instructions: Optional[str] = None,
     ):
-        self.names: Set[str] = VoiceActor.parse_names(names)
+        self.names: FrozenSet[str] = VoiceActor.parse_names(names)
         self.openai = openai
         self.model = model
         self.voice = voice
@@ -64,12 +63,14 @@ class OpenAIVoiceActor(VoiceActor):
         self.async_openai = AsyncOpenAI(api_key=api_key, base_url=base_url)
 
     @property
-    def speaker_names(self) -> Set[str]:
+    def speaker_names(self) -> FrozenSet[str]:
         return self.names
 
     def should_speak_message(self, message: ChatMessage) -> bool:
-        return (message.author.casefold() in self.names) and (
-            message.type == MessageType.SPEECH
+        # The type check is cheaper so is done first
+        return (
+            message.type is MessageType.SPEECH
+            and message.author.casefold() in self.names
         )
 
     def _create_kw_dict(self, message: ChatMessage) -> dict:
@@ -87,11 +88,7 @@ class OpenAIVoiceActor(VoiceActor):
         log.debug(f"Speaking message {message.msg_id} with OpenAI")
         folder_path.mkdir(parents=True, exist_ok=True)
 
-        out_path = None
-        with tempfile.NamedTemporaryFile(
-            dir=folder_path, suffix=self.file_suffix, delete=False
-        ) as f:
-            out_path = Path(f.name)
+        out_path: Path = self.new_output_path(folder_path, self.file_suffix)
 
         # Store keywords in a dict
         kw = self._create_kw_dict(message)
@@ -1,21 +1,40 @@
+import functools
 import queue
-import tempfile
 import threading
-import wave
 import logging
 from pathlib import Path
-from typing import Dict, Iterable, Optional, Set, Union
+from typing import Dict, FrozenSet, Iterable, Optional, Union
 
 import onnxruntime as ort
 import sounddevice as sd
 from piper.voice import PiperVoice, SynthesisConfig
 
+from . import fast_json
+from .audio_player import play_wav_bytes
 from .voice_actor import VoiceActor
 from .chat_message import ChatMessage, MessageType
+from .tts_cache import TTSCache, pcm_to_wav
+from .wav_writer import RawWavWriter, silence_wav
 
 log = logging.getLogger(__name__)
 
 
+def quantized_model_path(model_path: Path) -> Path:
+    """
+    The path of an int8 quantized copy of a model, as made by
+    `scripts/quantize_piper_model.py`
+    """
+    return model_path.with_suffix(".int8.onnx")
+
+
+@functools.lru_cache(maxsize=8)
+def _load_voice(model_path: str, config_path: str, use_cuda: bool) -> PiperVoice:
+    # Actors sharing a model share its ONNX Runtime session, which is safe to
+    # run from several threads
+    log.debug(f"Loading Piper model {model_path}")
+    return PiperVoice.load(model_path, config_path=config_path, use_cuda=use_cuda)
+
+
 class PiperVoiceActor(VoiceActor):
     """
     Voice Actor that uses the piper-tts library for voices.
@@ -25,6 +44,15 @@ class PiperVoiceActor(VoiceActor):
 
     Piper models can contain multiple voices (known as speakers) or a single
     voice.
+
+    When running on the CPU, an int8 quantized copy of the model (see
+    `quantized_model_path`) will be used instead if one exists, as it is
+    quicker to run.
+
+    Loaded models are cached, so actors using the same model share it.
+
+    If a `TTSCache` is given, synthesized speech is saved to it and repeated
+    lines are played from the cache instead of being synthesized again.
     """
 
     @classmethod
@@ -32,10 +60,10 @@ class PiperVoiceActor(VoiceActor):
         """
         Create an instance with names corresponding to the voice integers
         """
-        # Loads twice to get all speaker ids
-        voice: PiperVoice = PiperVoice.load(str(model_path))
-        speaker_count = voice.config.num_speakers
-        voice = None
+        # The speaker count is in the model's config, so there's no need to
+        # load the model to find it
+        config = fast_json.loads(Path(f"{model_path}.json").read_bytes())
+        speaker_count: int = config.get("num_speakers", 1)
         id_map = {str(i): i for i in range(speaker_count)}
         output = cls(id_map.keys(), model_path)
         output.speaker_map = id_map
@@ -46,18 +74,35 @@ class PiperVoiceActor(VoiceActor):
         names: Union[str, Iterable[str]],
         model_path: Path,
         speaker_id: Optional[int] = None,
+        prefer_quantized: bool = True,
+        tts_cache: Optional[TTSCache] = None,
     ):
-        self.names: Set[str] = VoiceActor.parse_names(names)
+        self.names: FrozenSet[str] = VoiceActor.parse_names(names)
         self.supports_cuda: bool = (
             "CUDAExecutionProvider" in ort.get_available_providers()
         )
-        self.voice: PiperVoice = PiperVoice.load(
-            str(model_path), use_cuda=self.supports_cuda
+        model_path = Path(model_path)
+        # The quantized copy shares the original model's config
+        config_path = Path(f"{model_path}.json")
+        load_path: Path = model_path
+        int8_path: Path = quantized_model_path(model_path)
+        if prefer_quantized and not self.supports_cuda and int8_path.exists():
+            log.info(f"Using quantized model {int8_path}")
+            load_path = int8_path
+        self.voice: PiperVoice = _load_voice(
+            str(load_path), str(config_path), self.supports_cuda
         )
+        self.tts_cache: Optional[TTSCache] = tts_cache
+        self._cache_namespace: str = load_path.stem
         self.syn_config = SynthesisConfig(speaker_id=speaker_id)
         self.speaker_map: Dict[str, int] = {}
         self.number_of_speakers: int = self.voice.config.num_speakers
 
+    def warm(self) -> None:
+        # Run a short synthesis so ONNX Runtime has done its first run setup
+        for _ in self.voice.synthesize("Hello.", syn_config=self.syn_config):
+            pass
+
     def set_speaker_id_for(self, name: str, speaker_id: int):
         """
         Allows you to override the speaker_id for a given name.
@@ -77,36 +122,50 @@ class PiperVoiceActor(VoiceActor):
             )
 
     @property
-    def speaker_names(self) -> Set[str]:
+    def speaker_names(self) -> FrozenSet[str]:
         return self.names
 
     def should_speak_message(self, message: ChatMessage) -> bool:
-        return (message.author.casefold() in self.names) and (
-            message.type == MessageType.SPEECH
+        # The type check is cheaper so is done first
+        return (
+            message.type is MessageType.SPEECH
+            and message.author.casefold() in self.names
         )
 
     def speak_message(self, message: ChatMessage, folder_path: Path) -> Path:
         log.debug(f"Speaking message {message.msg_id} with Piper")
         folder_path.mkdir(parents=True, exist_ok=True)
 
-        out_path = None
-        with tempfile.NamedTemporaryFile(
-            dir=folder_path, suffix=".wav", delete=False
-        ) as f:
-            out_path = Path(f.name)
+        out_path: Path = self.new_output_path(folder_path, ".wav")
 
         text = (message.content or "").strip()
+        if not text:
+            out_path.write_bytes(silence_wav(self.voice.config.sample_rate))
+            return out_path
+        config = self._get_config_for_author(message.author)
+        cached: Optional[bytes] = self._get_cached(text, config)
+        if cached is not None:
+            out_path.write_bytes(cached)
+            return out_path
+
+        # Piper outputs mono 16-bit PCM
+        with RawWavWriter(out_path, self.voice.config.sample_rate) as writer:
+            for chunk in self.voice.synthesize(text, syn_config=config):
+                writer.write(chunk.audio_int16_bytes)
+        if self.tts_cache:
+            self._put_cached(text, config, out_path.read_bytes())
+        return out_path
 
-        with wave.open(str(out_path), "wb") as wf:
-            wf.setnchannels(1)  # Piper outputs mono
-            wf.setsampwidth(2)  # 16-bit PCM
-            wf.setframerate(self.voice.config.sample_rate)
+    def _cache_key(self, text: str, config: SynthesisConfig) -> str:
+        return TTSCache.make_key(config.speaker_id, text)
 
-            if text:
-                config = self._get_config_for_author(message.author)
-                for chunk in self.voice.synthesize(text, syn_config=config):
-                    wf.writeframes(chunk.audio_int16_bytes)
-        return out_path
+    def _get_cached(self, text: str, config: SynthesisConfig) -> Optional[bytes]:
+        if not self.tts_cache or not text:
+            return None
+        return self.tts_cache.get(self._cache_namespace, self._cache_key(text, config))
+
+    def _put_cached(self, text: str, config: SynthesisConfig, wav: bytes):
+        self.tts_cache.put(self._cache_namespace, self._cache_key(text, config), wav)
 
     def _get_config_for_author(self, author: str) -> SynthesisConfig:
         config = self.syn_config
@@ -124,8 +183,16 @@ class PiperVoiceActor(VoiceActor):
         if not text:
             return
         config = self._get_config_for_author(message.author)
+        cached: Optional[bytes] = self._get_cached(text, config)
+        if cached is not None:
+            play_wav_bytes(cached)
+            return
+        # Piper yields one chunk per sentence, so later sentences are
+        # synthesized by the producer while earlier ones play
         gen = self.voice.synthesize(text, syn_config=config)
-        first_chunk = next(gen)
+        first_chunk = next(gen, None)
+        if first_chunk is None:
+            return
         assert first_chunk.sample_width == 2, "Expected 16-bit PCM"
         sample_rate = first_chunk.sample_rate
         channels = first_chunk.sample_channels or 1
@@ -135,15 +202,20 @@ class PiperVoiceActor(VoiceActor):
         fifo = queue.Queue(maxsize=32)
         playback_done = threading.Event()
 
+        # Kept to save in the cache once done
+        produced: list[bytes] = []
+
         def producer():
             # total = 0
             b = first_chunk.audio_int16_bytes
             fifo.put(b)
+            produced.append(b)
             # total += len(b)
             buffered = 1
             for chunk in gen:
                 b = chunk.audio_int16_bytes
                 fifo.put(b)
+                produced.append(b)
                 # total += len(b)
                 buffered += 1
             fifo.put(None)
@@ -155,8 +227,9 @@ class PiperVoiceActor(VoiceActor):
         # This is the buffer that will be drained while speaking
         buffer = bytearray()
         saw_eos_during_prebuffer = False
-        # Prebuffer some lines before playback begins
-        prebuffer_chunk_count = 2
+        # Prebuffer before playback begins, one sentence is enough since the
+        # producer keeps synthesizing ahead while it plays
+        prebuffer_chunk_count = 1
         for _ in range(prebuffer_chunk_count):
             item = fifo.get()
             if item is None:
@@ -235,3 +308,7 @@ class PiperVoiceActor(VoiceActor):
         ):
             prod_thread.join()
             playback_done.wait()
+
+        if self.tts_cache:
+            wav = pcm_to_wav(b"".join(produced), sample_rate, channels)
+            self._put_cached(text, config, wav)
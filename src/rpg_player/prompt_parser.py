@@ -1,30 +1,63 @@
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Optional, Union
 
 from jinja2 import Environment, Template
 
+# Shared by every parser so compiled templates can be reused between agents
+_ENV: Environment = Environment(cache_size=400, auto_reload=False)
+
+
+@lru_cache(maxsize=128)
+def _compile(text: str) -> Template:
+    return _ENV.from_string(text)
+
+
+@lru_cache(maxsize=128)
+def _read_prompt(path: Path, mtime_ns: int) -> str:
+    # mtime is part of the key so edited prompts are read again
+    return path.read_text("utf-8")
+
+
+@lru_cache(maxsize=256)
+def _render_prompt(path: Path, mtime_ns: int, variables: tuple) -> str:
+    # Agents sharing prefix/suffix files and variables reuse the rendered text
+    return _compile(_read_prompt(path, mtime_ns)).render(**dict(variables))
+
 
 class PromptParser:
     """
     Class for parsing prompts.
 
     This will template the prompts with whatever variables you pass into it.
+
+    Prompt files and their compiled templates are cached at module level, so
+    creating a parser per agent is cheap and shared prefix/suffix files are
+    only read and parsed once.
     """
 
     def __init__(self, variables: Optional[dict[str, Any]] = None):
         self.variables: dict[str, Any] = variables if variables is not None else {}
-        self.env: Environment = Environment()
+        self.env: Environment = _ENV
 
     def parse_text(self, text: str) -> str:
-        template: Template = self.env.from_string(text)
+        template: Template = _compile(text)
         return template.render(**self.variables)
 
     def parse_path(self, path: Union[Path, str]) -> str:
         if not isinstance(path, Path):
             path = Path(path)
-        if not path.exists():
-            raise FileNotFoundError(f"{path} does not exist")
-        return self.parse_text(path.read_text("utf-8"))
+        try:
+            mtime_ns: int = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            raise FileNotFoundError(f"{path} does not exist") from None
+        path = path.resolve()
+        try:
+            variables_key = tuple(sorted(self.variables.items()))
+            return _render_prompt(path, mtime_ns, variables_key)
+        except TypeError:
+            # Unhashable variables, so it can't be cached
+            return self.parse_text(_read_prompt(path, mtime_ns))
 
     def parse_prompt_paths(
         self,
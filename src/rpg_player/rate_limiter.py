@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Callable, Mapping, Optional
+
+from openai import AsyncOpenAI, RateLimitError
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_SECONDS: dict[str, float] = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset_duration(value: str) -> Optional[float]:
+    """
+    Parse an OpenAI rate limit reset header, like "1s", "6m0s" or "20ms", into
+    seconds.
+
+    Returns None if the value can't be parsed.
+    """
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_SECONDS[unit] for amount, unit in parts)
+
+
+def retry_after_seconds(headers: Mapping[str, str]) -> Optional[float]:
+    """
+    How long the server asked us to wait, from retry-after style headers
+    """
+    retry_ms = headers.get("retry-after-ms")
+    if retry_ms:
+        try:
+            return float(retry_ms) / 1000
+        except ValueError:
+            pass
+    retry = headers.get("retry-after")
+    if retry:
+        try:
+            return float(retry)
+        except ValueError:
+            pass
+    return None
+
+
+class AsyncResponsesLimiter:
+    """
+    Wraps an `AsyncOpenAI` client's `responses.create` to keep concurrent
+    agents within the account's rate limits.
+
+    At most `max_concurrency` requests are in flight at once. After each
+    response the `x-ratelimit-remaining-*` headers are checked, and if either
+    has run out, new requests wait until the matching reset time. Rate limit
+    errors are retried after the server's retry-after delay.
+
+    One limiter should be shared by every agent using the same API key.
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        default_retry_after: float = 1.0,
+    ):
+        """
+        :param client: The client to send requests with
+        :param max_concurrency: Maximum number of requests in flight
+        :param max_retries: Retries on rate limit errors before giving up
+        :param default_retry_after: Seconds to wait when the server doesn't
+            say how long to wait
+        """
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be greater than 0")
+        self.client: AsyncOpenAI = client
+        self.max_retries: int = max_retries
+        self.default_retry_after: float = default_retry_after
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._resume_at: float = 0.0
+        self.log = logging.getLogger(__name__)
+
+    async def create(self, **kwargs):
+        """
+        Call `responses.create` with the given arguments, waiting on the limits.
+
+        With `stream=True` the request keeps its place until the returned
+        stream has been read to the end or closed.
+        """
+        attempt: int = 0
+        while True:
+            await self._semaphore.acquire()
+            try:
+                await self._wait_for_reset()
+                raw = await self.client.responses.with_raw_response.create(**kwargs)
+                self._update_from_headers(raw.headers)
+                parsed = raw.parse()
+            except RateLimitError as e:
+                self._semaphore.release()
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                delay = retry_after_seconds(e.response.headers)
+                if delay is None:
+                    delay = self.default_retry_after
+                self.log.warning("Rate limited, retrying in %.2fs", delay)
+                self._pause_for(delay)
+                continue
+            except BaseException:
+                self._semaphore.release()
+                raise
+            if kwargs.get("stream"):
+                return _PermitStream(parsed, self._semaphore.release)
+            self._semaphore.release()
+            return parsed
+
+    async def _wait_for_reset(self):
+        delay: float = self._resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _pause_for(self, delay: float):
+        self._resume_at = max(self._resume_at, time.monotonic() + delay)
+
+    def _update_from_headers(self, headers: Mapping[str, str]):
+        for kind in ("requests", "tokens"):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is None or remaining.strip() != "0":
+                continue
+            reset = parse_reset_duration(headers.get(f"x-ratelimit-reset-{kind}", ""))
+            if reset:
+                self.log.debug("Out of %s, pausing for %.2fs", kind, reset)
+                self._pause_for(reset)
+
+
+class _PermitStream:
+    """
+    Wraps a response stream so the limiter's permit is given back once the
+    stream is finished with, rather than when the request is first answered
+    """
+
+    def __init__(self, stream, release: Callable[[], None]):
+        self._stream = stream
+        self._iterator = stream.__aiter__()
+        self._release_permit: Optional[Callable[[], None]] = release
+
+    def _release(self):
+        if self._release_permit is not None:
+            self._release_permit()
+            self._release_permit = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self._iterator.__anext__()
+        except BaseException:
+            # Ended, failed or was cancelled
+            self._release()
+            raise
+
+    async def close(self):
+        self._release()
+        close = getattr(self._stream, "close", None)
+        if close is not None:
+            await close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
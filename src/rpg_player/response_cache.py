@@ -0,0 +1,259 @@
+import hashlib
+import json
+import math
+import operator
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+from openai import OpenAI
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    size: int
+
+
+class ResponseCache:
+    """
+    A thread safe, in-memory LRU cache of response text with an optional TTL.
+
+    Keys are normally created with `make_key` from the full request payload so
+    that only identical requests (same model, instructions, input and
+    parameters) share a cached response.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 3600.0):
+        """
+        :param maxsize: Maximum number of entries kept before evicting the
+            least recently used one
+        :param ttl: Seconds an entry stays valid for, None means forever
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be greater than 0")
+        self.maxsize: int = maxsize
+        self.ttl: Optional[float] = ttl
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits: int = 0
+        self._misses: int = 0
+
+    @staticmethod
+    def make_key(payload: dict) -> str:
+        """
+        Create a stable key for the given request payload
+        """
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Return the cached value for the key, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if self.ttl is None or time.monotonic() - created < self.ttl:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+            self._misses += 1
+            return None
+
+    def put(self, key: str, value: str):
+        """
+        Store a value, evicting the least recently used entry if full
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self._hits, self._misses, len(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SqliteResponseCache(ResponseCache):
+    """
+    A `ResponseCache` that also saves entries to a SQLite database, so they
+    survive restarts.
+
+    Recently used entries are kept in memory as with `ResponseCache`, the
+    database is only read on an in-memory miss. The TTL is checked against
+    the time an entry was first saved.
+    """
+
+    def __init__(
+        self, path: Path, maxsize: int = 256, ttl: Optional[float] = 7 * 24 * 3600.0
+    ):
+        """
+        :param path: The database file, created if missing
+        :param maxsize: Maximum number of entries kept in memory
+        :param ttl: Seconds an entry stays valid for, None means forever
+        """
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.path: Path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        with self._db_lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, created REAL NOT NULL, value TEXT NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        value = super().get(key)
+        if value is not None:
+            return value
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT created, value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        created, value = row
+        if self.ttl is not None and time.time() - created >= self.ttl:
+            return None
+        with self._lock:
+            # Counted as a miss by the in-memory lookup
+            self._misses -= 1
+            self._hits += 1
+        super().put(key, value)
+        return value
+
+    def put(self, key: str, value: str):
+        super().put(key, value)
+        with self._db_lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, created, value) "
+                "VALUES (?, ?, ?)",
+                (key, time.time(), value),
+            )
+
+    def clear(self):
+        super().clear()
+        with self._db_lock, self._db:
+            self._db.execute("DELETE FROM responses")
+
+    def close(self):
+        with self._db_lock:
+            self._db.close()
+
+
+class SemanticResponseCache:
+    """
+    A cache of responses looked up by the meaning of recent messages rather
+    than their exact text.
+
+    The last few messages of a request are embedded with an OpenAI embedding
+    model and compared, by cosine similarity, against previously seen
+    requests within the same scope (normally a hash of the agent's system
+    prompt). If the best match is at or above the threshold its response is
+    reused.
+
+    Entries are held in memory and scanned linearly, so `maxsize` should be
+    kept modest.
+    """
+
+    def __init__(
+        self,
+        openai: OpenAI,
+        model: str = "text-embedding-3-small",
+        threshold: float = 0.92,
+        window: int = 3,
+        maxsize: int = 256,
+    ):
+        """
+        :param openai: OpenAI SDK client used for embeddings
+        :param model: Embedding model name
+        :param threshold: Minimum cosine similarity for a hit
+        :param window: How many of the latest messages are embedded
+        :param maxsize: Maximum entries kept, oldest are dropped first
+        """
+        self.openai: OpenAI = openai
+        self.model: str = model
+        self.threshold: float = threshold
+        self.window: int = window
+        self._entries: deque[Tuple[str, List[float], str]] = deque(maxlen=maxsize)
+        self._lock = threading.Lock()
+        self._hits: int = 0
+        self._misses: int = 0
+
+    @staticmethod
+    def make_scope(text: str) -> str:
+        """
+        Create a scope from some text, normally a system prompt
+        """
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def query_text(self, request_msgs: List[dict]) -> str:
+        """
+        The text that will be embedded for the given OpenAI style messages
+        """
+        recent = request_msgs[-self.window :] if self.window > 0 else []
+        return "\n".join(f"{m['role']}: {m['content']}" for m in recent)
+
+    def embed(self, text: str) -> List[float]:
+        """
+        Embed the text, returning a unit length vector
+        """
+        response = self.openai.embeddings.create(model=self.model, input=text)
+        vector: List[float] = list(response.data[0].embedding)
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm > 0:
+            vector = [v / norm for v in vector]
+        return vector
+
+    def lookup(self, scope: str, embedding: List[float]) -> Optional[str]:
+        """
+        Return the cached response most similar to the embedding, if similar
+        enough
+        """
+        best_score: float = -1.0
+        best_value: Optional[str] = None
+        with self._lock:
+            for entry_scope, vector, value in self._entries:
+                if entry_scope != scope:
+                    continue
+                score = sum(map(operator.mul, vector, embedding))
+                if score > best_score:
+                    best_score = score
+                    best_value = value
+            if best_value is not None and best_score >= self.threshold:
+                self._hits += 1
+                return best_value
+            self._misses += 1
+            return None
+
+    def add(self, scope: str, embedding: List[float], value: str):
+        with self._lock:
+            self._entries.append((scope, embedding, value))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self._hits, self._misses, len(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
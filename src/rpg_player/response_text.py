@@ -0,0 +1,21 @@
+def extract_output_text(response) -> str:
+    """
+    Get the assistant's text from an OpenAI Responses API response.
+
+    The structured output is preferred, GPT-4/GPT-5 both use 'message' items
+    for assistant replies, made up of 'output_text' blocks. If there are none
+    the SDK's `output_text` helper is used instead.
+    """
+    collected: list[str] = [
+        block.text
+        for item in (getattr(response, "output", None) or ())
+        if item.type == "message"
+        for block in (item.content or ())
+        if block.type == "output_text" and block.text
+    ]
+
+    if collected:
+        return "\n".join(collected).strip()
+
+    # Fallback for SDK helpers that sometimes populate this
+    return (getattr(response, "output_text", "") or "").strip()
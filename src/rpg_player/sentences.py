@@ -0,0 +1,58 @@
+import re
+from typing import List
+
+# End of a sentence: terminal punctuation, optional closing quotes/brackets,
+# then whitespace
+_SENTENCE_END = re.compile(r"[.!?…]+[\"'”’)\]]*(?=\s)")
+
+
+def split_sentences(text: str, min_length: int = 0) -> List[str]:
+    """
+    Split text into sentences on terminal punctuation followed by whitespace.
+
+    Empty sentences are dropped. Sentences shorter than min_length are joined
+    with the next one.
+    """
+    buffer = SentenceBuffer(min_length=min_length)
+    return buffer.feed(text) + buffer.flush()
+
+
+class SentenceBuffer:
+    """
+    Collects streamed text and hands back whole sentences as they complete.
+
+    This is used to start speaking a response before it has finished being
+    generated. Any text left at the end should be collected with `flush`.
+    """
+
+    def __init__(self, min_length: int = 20):
+        """
+        :param min_length: Sentences shorter than this are joined with the
+            next one, to avoid speaking lots of tiny fragments
+        """
+        self.min_length: int = min_length
+        self._pending: str = ""
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Add streamed text, returning any sentences it completed
+        """
+        self._pending += text
+        sentences: List[str] = []
+        start: int = 0
+        for match in _SENTENCE_END.finditer(self._pending):
+            candidate = self._pending[start : match.end()].strip()
+            if len(candidate) < self.min_length:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self._pending = self._pending[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        """
+        Return whatever text is left over and reset the buffer
+        """
+        remaining = self._pending.strip()
+        self._pending = ""
+        return [remaining] if remaining else []
@@ -1,16 +1,60 @@
+import asyncio
 import json
 import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Callable, List, Optional
+from typing import Callable, List, Optional, TextIO
 
 from .agent import Agent
 from .audio_player import SoundDevicePlayer
 from .chat_message import ChatMessage, ChatMessages
 from .message_transformer import ChatMessageTransformer
+from .sentences import SentenceBuffer
 from .voice_actor import VoiceActorManager
 
 log = logging.getLogger(__name__)
 
+# How many messages are written before the messages file is synced to disk
+FSYNC_EVERY: int = 10
+
+
+class _SentenceSpeaker:
+    """
+    Speaks streamed text a sentence at a time on the given single threaded
+    executor, keeping the sentences in order.
+    """
+
+    def __init__(
+        self,
+        author: str,
+        speak: Callable[[ChatMessage], None],
+        pool: ThreadPoolExecutor,
+    ):
+        self.author: str = author
+        self.speak: Callable[[ChatMessage], None] = speak
+        self._pool: ThreadPoolExecutor = pool
+        self._sentences = SentenceBuffer()
+        self._spoken: List[Future] = []
+
+    def feed(self, text: str):
+        self._submit(self._sentences.feed(text))
+
+    def finish(self):
+        """
+        Speak any remaining text and block until everything has been spoken
+        """
+        self._submit(self._sentences.flush())
+        for future in self._spoken:
+            error = future.exception()
+            if error:
+                log.error(f"Failed to speak sentence: {error}")
+
+    def _submit(self, sentences: List[str]):
+        for sentence in sentences:
+            msg = ChatMessage.speech(self.author, sentence)
+            self._spoken.append(self._pool.submit(self.speak, msg))
+
 
 class StateMachine:
     """
@@ -49,6 +93,11 @@ class StateMachine:
         self.voice_actors: VoiceActorManager = voice_actors
         self.player: SoundDevicePlayer = SoundDevicePlayer()
         self.message_transformer: Optional[ChatMessageTransformer] = message_transformer
+        # All speech goes through one long lived thread so it stays in order
+        self._speech_pool = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="speech"
+        )
+        self._closing: bool = False
         if delete_audio:
 
             def delete_path(path: Path):
@@ -63,6 +112,8 @@ class StateMachine:
 
         # Loading and restoring state
         self.messages_file: Optional[Path] = None
+        self._messages_handle: Optional[TextIO] = None
+        self._unsynced_messages: int = 0
         if messages_file:
             self.messages_file = messages_file
             if messages_file.exists():
@@ -77,13 +128,25 @@ class StateMachine:
         log.debug(f"Adding message: {message.msg_id}")
         self.messages.append(message)
         if self.messages_file:
-            # Append to messages file
-            with self.messages_file.open("a", encoding="utf-8") as f:
-                f.write(json.dumps(message.to_dict()))
-                f.write("\n")
+            self._append_to_messages_file(message)
         if self.message_listener:
             self.message_listener(message)
 
+    def _append_to_messages_file(self, message: ChatMessage):
+        # The file is kept open and only appended to. Each message is flushed
+        # so it survives the app crashing, but only synced to disk every few
+        # messages (and on close) as that is much slower.
+        if self._messages_handle is None:
+            self._messages_handle = self.messages_file.open("a", encoding="utf-8")
+        f = self._messages_handle
+        f.write(json.dumps(message.to_dict()))
+        f.write("\n")
+        f.flush()
+        self._unsynced_messages += 1
+        if self._unsynced_messages >= FSYNC_EVERY:
+            os.fsync(f.fileno())
+            self._unsynced_messages = 0
+
     @property
     def agent_names(self) -> List[str]:
         return [a.name for a in self.agents]
@@ -104,13 +167,105 @@ class StateMachine:
         """
         Given an agent index, asks the agent to respond
         """
+        agent: Agent = self._get_agent(index)
+        response: ChatMessage = agent.respond(self.messages)
+        return self._process_response(response)
+
+    def agent_respond_stream(
+        self, index: int, handler: Callable[[str], None], speak: bool = False
+    ) -> ChatMessage:
+        """
+        Like `agent_respond` but passes the agent's text to the handler as it
+        is generated.
+
+        If speak is True, each sentence is voiced in a background thread as
+        soon as it is complete, so speech overlaps with the rest of the
+        response being generated. This returns once everything has been
+        spoken, and the message should not be played again.
+
+        The final (transformed) message is only added once the agent is done.
+        """
+        agent: Agent = self._get_agent(index)
+        speaker: Optional[_SentenceSpeaker] = None
+        if speak:
+            speaker = _SentenceSpeaker(
+                agent.name, self._speak_sentence, self._speech_pool
+            )
+
+        def on_text(text: str):
+            handler(text)
+            if speaker:
+                speaker.feed(text)
+
+        try:
+            response: ChatMessage = agent.respond_stream(self.messages, on_text)
+            return self._process_response(response)
+        finally:
+            if speaker:
+                speaker.finish()
+
+    async def aagent_respond_stream(
+        self, index: int, handler: Callable[[str], None], speak: bool = False
+    ) -> ChatMessage:
+        """
+        Asynchronous version of `agent_respond_stream`.
+
+        The handler is called on the event loop's thread, so it can update the
+        UI directly.
+        """
+        agent: Agent = self._get_agent(index)
+        speaker: Optional[_SentenceSpeaker] = None
+        if speak:
+            speaker = _SentenceSpeaker(
+                agent.name, self._speak_sentence, self._speech_pool
+            )
+
+        def on_text(text: str):
+            handler(text)
+            if speaker:
+                speaker.feed(text)
+
+        try:
+            response: ChatMessage = await agent.arespond_stream(self.messages, on_text)
+            return await asyncio.to_thread(self._process_response, response)
+        finally:
+            if speaker:
+                await asyncio.to_thread(speaker.finish)
+
+    async def aagent_respond(self, index: int) -> ChatMessage:
+        """
+        Asynchronous version of `agent_respond`.
+
+        The agent is awaited directly, while transforming and storing the
+        response (which may block) is done in a thread.
+        """
+        agent: Agent = self._get_agent(index)
+        response: ChatMessage = await agent.arespond(self.messages)
+        return await asyncio.to_thread(self._process_response, response)
+
+    async def all_agents_respond(self) -> List[ChatMessage]:
+        """
+        Ask every agent to respond to the current messages at the same time.
+
+        All agents see the same messages, not each other's new responses. The
+        responses are added in agent order.
+        """
+        responses: List[ChatMessage] = await asyncio.gather(
+            *(agent.arespond(self.messages) for agent in self.agents)
+        )
+        return await asyncio.to_thread(
+            lambda: [self._process_response(r) for r in responses]
+        )
+
+    def _get_agent(self, index: int) -> Agent:
         length = len(self.agents)
         if index >= length:
             raise IndexError(
                 f"{index} is out of bounds for agents list of length {length}"
             )
-        agent: Agent = self.agents[index]
-        response: ChatMessage = agent.respond(self.messages)
+        return self.agents[index]
+
+    def _process_response(self, response: ChatMessage) -> ChatMessage:
         # Transformer an agent response if needed
         if self.message_transformer:
             response = self.message_transformer.transform(response)
@@ -128,6 +283,46 @@ class StateMachine:
         elif not spoke:
             log.warning(f"No actor for message from {message.author} {message.msg_id}")
 
+    def speak_message(self, message: ChatMessage) -> Future:
+        """
+        Queue the message to be spoken on the speech thread.
+
+        The returned future completes once it has finished playing.
+        """
+        return self._speech_pool.submit(self._play_and_wait, message)
+
+    def _speak_sentence(self, sentence: ChatMessage):
+        if self.message_transformer:
+            sentence = self.message_transformer.transform(sentence)
+        self._play_and_wait(sentence)
+
+    def _play_and_wait(self, message: ChatMessage):
+        if self._closing:
+            return
+        self.play_message(message)
+        # File based actors play in the background, wait so messages don't
+        # interrupt each other
+        self.player.wait()
+
+    def close(self):
+        """
+        Stop any speech, dropping whatever is still queued, and close the
+        messages file
+        """
+        self._closing = True
+        # Cancel the queue before stopping playback so the speech thread
+        # doesn't move on to the next message
+        self._speech_pool.shutdown(wait=False, cancel_futures=True)
+        if self.player.is_playing or self.player.is_paused:
+            self.player.stop_audio()
+        self._speech_pool.shutdown(wait=True, cancel_futures=True)
+        if self._messages_handle is not None:
+            self._messages_handle.flush()
+            os.fsync(self._messages_handle.fileno())
+            self._messages_handle.close()
+            self._messages_handle = None
+            self._unsynced_messages = 0
+
     def play_audio(self, path: Path):
         log.debug(f"Playing audio: {path}")
         if self.player.is_playing or self.player.is_paused:
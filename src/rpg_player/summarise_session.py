@@ -18,6 +18,7 @@ from dotenv import load_dotenv
 from openai import OpenAI
 
 from .chat_message import ChatMessage, ChatMessages, MessageType
+from .response_text import extract_output_text
 from .token_counter import TiktokenTokenCounter, TokenCounter
 
 log = logging.getLogger(__name__)
@@ -222,22 +223,7 @@ def run_summary(client: OpenAI, model: str, text: str, instructions: str) -> str
         model=model,
     )
 
-    # Depending on model the output can be slightly different
-    output = getattr(response, "output", None) or []
-    collected: List[str] = []
-    for item in output:
-        if getattr(item, "type", None) != "message":
-            continue
-        # item.content is a list of blocks
-        for block in getattr(item, "content", []) or []:
-            if getattr(block, "type", None) == "output_text":
-                txt = getattr(block, "text", "") or ""
-                if txt:
-                    collected.append(txt)
-    if collected:
-        return "\n".join(collected).strip()
-    # Fallback to output_text
-    return (getattr(response, "output_text", "") or "").strip()
+    return extract_output_text(response)
 
 
 def format_message(msg: ChatMessage) -> str:
@@ -0,0 +1,113 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from .wav_writer import wav_header
+
+log = logging.getLogger(__name__)
+
+
+def default_cache_folder() -> Path:
+    """
+    The default folder for cached speech, under the user's cache directory
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "rpg-player" / "tts"
+
+
+def pcm_to_wav(
+    pcm: bytes, sample_rate: int, channels: int = 1, sample_width: int = 2
+) -> bytes:
+    """
+    Wrap raw PCM audio in a WAV container
+    """
+    return wav_header(sample_rate, channels, sample_width, len(pcm)) + pcm
+
+
+class TTSCache:
+    """
+    A cache of synthesized speech stored as WAV files on disk.
+
+    Entries are grouped by a namespace (normally the voice actor or model) and
+    keyed with `make_key`, which should include anything that changes the
+    output, like the speaker and the text. Recently used entries are also
+    kept in memory.
+    """
+
+    def __init__(
+        self,
+        folder: Optional[Path] = None,
+        memory_size: int = 64,
+        ttl: Optional[float] = None,
+    ):
+        """
+        :param folder: Where to store the files, defaults to
+            `default_cache_folder()`
+        :param memory_size: How many entries to keep in memory
+        :param ttl: Seconds a file on disk stays valid for, None means forever
+        """
+        self.folder: Path = folder if folder is not None else default_cache_folder()
+        self.memory_size: int = memory_size
+        self.ttl: Optional[float] = ttl
+        self._memory: OrderedDict[Path, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """
+        Create a key from everything that affects the synthesized audio
+        """
+        joined = "\x00".join(str(p) for p in parts)
+        return hashlib.sha1(joined.encode("utf-8")).hexdigest()
+
+    def path_for(self, namespace: str, key: str) -> Path:
+        return self.folder / namespace / f"{key}.wav"
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        """
+        Return the cached WAV bytes, or None if not cached
+        """
+        path = self.path_for(namespace, key)
+        with self._lock:
+            data = self._memory.get(path)
+            if data is not None:
+                self._memory.move_to_end(path)
+                return data
+        try:
+            if self.ttl is not None and time.time() - path.stat().st_mtime >= self.ttl:
+                log.debug(f"Cached speech expired: {path}")
+                return None
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        self._remember(path, data)
+        return data
+
+    def put(self, namespace: str, key: str, data: bytes):
+        """
+        Store WAV bytes in the cache
+        """
+        path = self.path_for(namespace, key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename so a partly written file is never read
+            tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            tmp_path.replace(path)
+        except OSError as e:
+            log.warning(f"Failed to cache speech at {path}: {e}")
+        self._remember(path, data)
+
+    def _remember(self, path: Path, data: bytes):
+        if self.memory_size <= 0:
+            return
+        with self._lock:
+            self._memory[path] = data
+            self._memory.move_to_end(path)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
@@ -1,8 +1,10 @@
 import logging
 import tempfile
+import uuid
 from abc import ABC, abstractmethod
+from functools import cached_property
 from pathlib import Path
-from typing import Iterable, List, Set, Union
+from typing import FrozenSet, Iterable, List, Set, Tuple, Union
 
 from .chat_message import ChatMessage
 
@@ -15,9 +17,9 @@ class VoiceActor(ABC):
     """
 
     @staticmethod
-    def parse_names(names: Union[str, Iterable[str]]) -> Set[str]:
+    def parse_names(names: Union[str, Iterable[str]]) -> FrozenSet[str]:
         """
-        Normalize names into a set of casefolded strings.
+        Normalize names into a frozen set of casefolded strings.
 
         names can be a single string or some kind of Iterable
         """
@@ -32,7 +34,16 @@ class VoiceActor(ABC):
                 raise TypeError("names must be a string or an iterable of strings")
             if not all(isinstance(n, str) for n in names):  # type: ignore[iterable-issue]
                 raise TypeError("all elements of 'names' must be strings")
-        return norm_names
+        return frozenset(norm_names)
+
+    @staticmethod
+    def new_output_path(folder_path: Path, suffix: str = ".wav") -> Path:
+        """
+        A new, unique path in the folder for a voiced line to be written to.
+
+        The file itself is not created.
+        """
+        return folder_path / f"{uuid.uuid4().hex}{suffix}"
 
     @abstractmethod
     def speak_message(self, message: ChatMessage, folder_path: Path) -> Path:
@@ -43,6 +54,14 @@ class VoiceActor(ABC):
 
         raise NotImplementedError
 
+    def warm(self) -> None:
+        """
+        Get the voice actor ready to speak, so the first message isn't slowed
+        down by loading or first-run costs.
+
+        This may block and by default does nothing.
+        """
+
     @abstractmethod
     def should_speak_message(self, message: ChatMessage) -> bool:
         """
@@ -52,12 +71,20 @@ class VoiceActor(ABC):
 
     @property
     @abstractmethod
-    def speaker_names(self) -> Set[str]:
+    def speaker_names(self) -> FrozenSet[str]:
         """
         The speaker names this voice actor will work for
         """
         raise NotImplementedError
 
+    @cached_property
+    def sorted_speaker_names(self) -> Tuple[str, ...]:
+        """
+        The speaker names in sorted order, worked out once since the names
+        don't change after construction
+        """
+        return tuple(sorted(self.speaker_names))
+
     @property
     @abstractmethod
     def can_speak_out_loud(self) -> bool:
@@ -0,0 +1,90 @@
+import struct
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+# Size of the canonical PCM WAV header
+HEADER_SIZE: int = 44
+
+
+def wav_header(
+    sample_rate: int, channels: int = 1, sample_width: int = 2, data_size: int = 0
+) -> bytes:
+    """
+    Build a canonical 44 byte PCM WAV header for the given data size
+    """
+    block_align: int = channels * sample_width
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        36 + data_size,
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,  # PCM
+        channels,
+        sample_rate,
+        sample_rate * block_align,
+        block_align,
+        sample_width * 8,
+        b"data",
+        data_size,
+    )
+
+
+@lru_cache(maxsize=8)
+def silence_wav(sample_rate: int, duration_ms: int = 20) -> bytes:
+    """
+    A short mono 16-bit WAV of silence, used in place of synthesizing nothing
+    """
+    data_size: int = sample_rate * duration_ms // 1000 * 2
+    return wav_header(sample_rate, data_size=data_size) + bytes(data_size)
+
+
+class RawWavWriter:
+    """
+    Writes PCM audio straight to a WAV file.
+
+    The header is written once up front and its sizes are filled in on close,
+    so each chunk is a plain buffered write. Use it as a context manager:
+
+        with RawWavWriter(path, 16000) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        sample_rate: int,
+        channels: int = 1,
+        sample_width: int = 2,
+        buffering: int = 64 * 1024,
+    ):
+        self.path: Path = path
+        self.sample_rate: int = sample_rate
+        self.channels: int = channels
+        self.sample_width: int = sample_width
+        self.buffering: int = buffering
+        self.data_size: int = 0
+        self._file: Optional[BinaryIO] = None
+
+    def __enter__(self) -> "RawWavWriter":
+        self._file = open(self.path, "wb", buffering=self.buffering)
+        self._file.write(wav_header(self.sample_rate, self.channels, self.sample_width))
+        return self
+
+    def write(self, pcm: bytes) -> int:
+        written: int = self._file.write(pcm)
+        self.data_size += written
+        return written
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._file.seek(4)
+            self._file.write((36 + self.data_size).to_bytes(4, "little"))
+            self._file.seek(40)
+            self._file.write(self.data_size.to_bytes(4, "little"))
+        finally:
+            self._file.close()
+            self._file = None
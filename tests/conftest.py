@@ -1,7 +1,10 @@
 # conftest.py
+import threading
 import time
 import wave
 from pathlib import Path
+
+import numpy as np
 import pytest
 
 
@@ -21,29 +24,143 @@ def temp_wav(tmp_path: Path) -> Path:
     return path
 
 
-# ---- fake OutputStream that just "accepts" writes ----
+# ---- fake OutputStream that pulls blocks from its callback ----
 class FakeOutputStream:
-    def __init__(self, samplerate, channels, sleep_per_write=0.005):
+    def __init__(
+        self,
+        samplerate,
+        channels,
+        blocksize=512,
+        callback=None,
+        finished_callback=None,
+        sleep_per_write=0.005,
+        dtype="float32",
+        **kwargs,
+    ):
         self.samplerate = samplerate
         self.channels = channels
+        self.blocksize = blocksize
+        self.callback = callback
+        self.finished_callback = finished_callback
         self.sleep_per_write = sleep_per_write
+        self.dtype = dtype
         self.closed = False
         self.total_frames = 0
+        self.played = bytearray()
+        self._aborted = threading.Event()
+        self._thread = None
+        type(self).last = self
 
     def __enter__(self):
+        if self.callback is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
         return self
 
     def __exit__(self, exc_type, exc, tb):
+        self.abort()
         self.closed = True
 
+    def _run(self):
+        import sounddevice as sd
+
+        outdata = self._new_outdata()
+        try:
+            while not self._aborted.is_set():
+                try:
+                    self.callback(outdata, self.blocksize, None, None)
+                finally:
+                    # The last block is still played after CallbackStop
+                    self.played += bytes(memoryview(outdata))
+                self.total_frames += self.blocksize
+                time.sleep(self.sleep_per_write)
+        except (sd.CallbackStop, sd.CallbackAbort):
+            pass
+        if self.finished_callback:
+            self.finished_callback()
+
+    def _new_outdata(self):
+        return np.zeros((self.blocksize, self.channels), dtype=self.dtype)
+
+    def abort(self):
+        self._aborted.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
     def write(self, block):
         # Simulate time passing per block and count frames
         self.total_frames += len(block)
         time.sleep(self.sleep_per_write)
 
 
+class FakeRawOutputStream(FakeOutputStream):
+    def __init__(self, samplerate, channels, dtype="int16", **kwargs):
+        super().__init__(samplerate, channels, dtype=dtype, **kwargs)
+
+    def _new_outdata(self):
+        # Raw streams are given a plain buffer rather than an array
+        return bytearray(self.blocksize * self.channels * 2)
+
+
+# ---- fake RawInputStream that feeds its callback a rising sample count ----
+class FakeRawInputStream:
+    def __init__(self, samplerate, channels, blocksize=1024, callback=None, **kwargs):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.callback = callback
+        self.captured = bytearray()
+        self._stopped = threading.Event()
+        self._thread = None
+        type(self).last = self
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        sample = 0
+        while not self._stopped.is_set():
+            count = self.blocksize * self.channels
+            block = (np.arange(sample, sample + count) % 30000).astype(np.int16)
+            sample += count
+            indata = bytes(block.data)
+            self.captured += indata
+            self.callback(indata, self.blocksize, None, None)
+            time.sleep(0.002)
+
+
 @pytest.fixture
 def patch_sounddevice(monkeypatch):
     import sounddevice as sd
 
     monkeypatch.setattr(sd, "OutputStream", FakeOutputStream)
+    monkeypatch.setattr(sd, "RawOutputStream", FakeRawOutputStream)
+    monkeypatch.setattr(sd, "RawInputStream", FakeRawInputStream)
+
+
+@pytest.fixture
+def fake_raw_output_stream(patch_sounddevice):
+    """
+    The fake RawOutputStream class, its `last` instance holds what was played
+    """
+    return FakeRawOutputStream
+
+
+@pytest.fixture
+def fake_raw_input_stream(patch_sounddevice):
+    """
+    The fake RawInputStream class, its `last` instance holds what was captured
+    """
+    return FakeRawInputStream
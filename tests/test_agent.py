@@ -0,0 +1,180 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from rpg_player.agent import DummyAgent, OpenAIAgent
+from rpg_player.batch_agent import BatchOpenAIAgent
+from rpg_player.chat_message import ChatMessage, ChatMessages
+from rpg_player.response_cache import ResponseCache
+from rpg_player.response_text import extract_output_text
+
+
+def _fake_response(text: str):
+    block = SimpleNamespace(type="output_text", text=text)
+    item = SimpleNamespace(type="message", content=[block])
+    return SimpleNamespace(output=[item], output_text=text)
+
+
+def test_dummy_agent_arespond():
+    agent = DummyAgent("Bob", "Hello")
+    msg = asyncio.run(agent.arespond(ChatMessages()))
+    assert msg.author == "Bob"
+    assert msg.content == "Hello"
+
+
+def test_openai_agent_arespond():
+    async_openai = Mock()
+    async_openai.responses.create = AsyncMock(return_value=_fake_response("Hi"))
+    agent = OpenAIAgent(Mock(), "Bob", "Be Bob", async_openai=async_openai)
+    messages = ChatMessages()
+    messages.append(ChatMessage.narration("DM", "Hello Bob"))
+
+    msg = asyncio.run(agent.arespond(messages))
+
+    assert msg.author == "Bob"
+    assert msg.content == "Hi"
+    kwargs = async_openai.responses.create.call_args.kwargs
+    assert kwargs["input"] == messages.as_openai
+    assert kwargs["instructions"] == agent.system_message
+
+
+def test_openai_agent_uses_response_cache():
+    openai = Mock()
+    openai.responses.create.return_value = _fake_response("Hi")
+    cache = ResponseCache()
+    agent = OpenAIAgent(openai, "Bob", "Be Bob", response_cache=cache)
+    messages = ChatMessages()
+    messages.append(ChatMessage.narration("DM", "Hello Bob"))
+
+    first = agent.respond(messages)
+    second = agent.respond(messages)
+
+    assert first.content == second.content == "Hi"
+    assert openai.responses.create.call_count == 1
+    assert cache.stats.hits == 1
+
+
+def test_openai_agent_skips_cache_with_temperature():
+    openai = Mock()
+    openai.responses.create.return_value = _fake_response("Hi")
+    cache = ResponseCache()
+    agent = OpenAIAgent(
+        openai,
+        "Bob",
+        "Be Bob",
+        extra_kwargs={"temperature": 0.7},
+        response_cache=cache,
+    )
+    messages = ChatMessages()
+
+    agent.respond(messages)
+    agent.respond(messages)
+
+    assert openai.responses.create.call_count == 2
+    assert len(cache) == 0
+
+
+def test_dummy_respond_stream_calls_handler():
+    agent = DummyAgent("Bob", "Hello")
+    seen: list[str] = []
+    result = agent.respond_stream(ChatMessages(), seen.append)
+    assert seen == [result.content]
+
+
+def test_openai_respond_stream_passes_deltas():
+    events = [
+        SimpleNamespace(type="response.output_text.delta", delta="Hello "),
+        SimpleNamespace(type="response.output_text.delta", delta="there"),
+        SimpleNamespace(
+            type="response.completed", response=_fake_response("Hello there")
+        ),
+    ]
+    client = Mock()
+    client.responses.create.return_value = iter(events)
+    agent = OpenAIAgent(client, "Bob", "Be Bob")
+    seen: list[str] = []
+    result = agent.respond_stream(ChatMessages(), seen.append)
+    assert seen == ["Hello ", "there"]
+    assert result.content == "Hello there"
+    assert client.responses.create.call_args.kwargs["stream"] is True
+
+
+def test_batch_agent_run_batch():
+    client = Mock()
+    client.files.create.return_value = SimpleNamespace(id="file-in")
+    client.batches.create.return_value = SimpleNamespace(id="batch-1")
+    client.batches.retrieve.return_value = SimpleNamespace(
+        status="completed", output_file_id="file-out", error_file_id=None
+    )
+    body = {
+        "output": [
+            {"type": "message", "content": [{"type": "output_text", "text": "Hi"}]}
+        ]
+    }
+    row = {"custom_id": "turn-1", "response": {"status_code": 200, "body": body}}
+    client.files.content.return_value = SimpleNamespace(text=json.dumps(row))
+    agent = BatchOpenAIAgent(client, "Bob", "Be Bob", mode="batch")
+    messages = ChatMessages()
+    messages.append(ChatMessage.narration("DM", "Hello Bob"))
+
+    with pytest.raises(RuntimeError):
+        agent.respond(messages)
+    agent.add_task("turn-1", messages)
+    results = agent.run_batch()
+
+    assert results["turn-1"].content == "Hi"
+    assert agent.pending_tasks == 0
+    assert client.batches.create.call_args.kwargs["endpoint"] == "/v1/responses"
+
+
+def test_batch_agent_add_task_snapshots_messages():
+    agent = BatchOpenAIAgent(Mock(), "Bob", "Be Bob", mode="batch")
+    messages = ChatMessages()
+    messages.append(ChatMessage.narration("DM", "Hello Bob"))
+    agent.add_task("turn-1", messages)
+    messages.append(ChatMessage.speech("Bob", "Hello DM"))
+
+    assert len(agent._tasks[0][1]["input"]) == 1
+
+
+def test_openai_arespond_stream_passes_deltas():
+    events = [
+        SimpleNamespace(type="response.output_text.delta", delta="Hi "),
+        SimpleNamespace(type="response.output_text.delta", delta="Bob"),
+        SimpleNamespace(type="response.completed", response=_fake_response("Hi Bob")),
+    ]
+
+    async def stream():
+        for event in events:
+            yield event
+
+    async_openai = Mock()
+    async_openai.responses.create = AsyncMock(return_value=stream())
+    agent = OpenAIAgent(Mock(), "Bob", "Be Bob", async_openai=async_openai)
+    seen: list[str] = []
+
+    result = asyncio.run(agent.arespond_stream(ChatMessages(), seen.append))
+
+    assert seen == ["Hi ", "Bob"]
+    assert result.content == "Hi Bob"
+    assert async_openai.responses.create.call_args.kwargs["stream"] is True
+
+
+def test_extract_output_text():
+    reasoning = SimpleNamespace(type="reasoning", content=None)
+    message = SimpleNamespace(
+        type="message",
+        content=[
+            SimpleNamespace(type="output_text", text="Hello"),
+            SimpleNamespace(type="refusal", text="No"),
+            SimpleNamespace(type="output_text", text="there "),
+        ],
+    )
+    response = SimpleNamespace(output=[reasoning, message], output_text="ignored")
+    assert extract_output_text(response) == "Hello\nthere"
+
+    fallback = SimpleNamespace(output=[], output_text=" Fallback ")
+    assert extract_output_text(fallback) == "Fallback"
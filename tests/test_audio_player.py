@@ -1,7 +1,11 @@
+import threading
 import time
 from pathlib import Path
 
-from rpg_player.audio_player import SoundDevicePlayer
+import numpy as np
+import pytest
+
+from rpg_player.audio_player import PCMRingBuffer, SoundDevicePlayer, play_pcm_stream
 
 
 def test_play_and_progress(temp_wav: Path, patch_sounddevice):
@@ -75,3 +79,91 @@ def test_stop_mid_playback(temp_wav: Path, patch_sounddevice):
 
     # Player should not be playing now
     assert not player.is_playing
+
+
+def test_plays_every_frame(temp_wav: Path, patch_sounddevice):
+    finished = []
+    player = SoundDevicePlayer(blocksize=1000)
+    player.register_finished_callback(finished.append)
+    assert player.play_file(temp_wav)
+    assert player.wait(timeout=5.0)
+
+    assert finished == [temp_wav]
+    # 0.25 seconds at 44.1 kHz, the last block is only partly filled
+    assert player._frames_played == 11025
+
+
+def test_progress_is_throttled(temp_wav: Path, patch_sounddevice):
+    calls = []
+    player = SoundDevicePlayer(blocksize=256, progress_interval=0.1)
+    player.register_progress_callback(lambda current, total: calls.append(current))
+    assert player.play_file(temp_wav)
+    assert player.wait(timeout=5.0)
+
+    # 0.25 seconds of audio, the first call comes from play_file
+    assert 2 <= len(calls) <= 5
+    assert calls[-1] == 0.25
+
+
+def test_stop_while_paused(temp_wav: Path, patch_sounddevice):
+    player = SoundDevicePlayer(blocksize=256, ring_blocks=2)
+    assert player.play_file(temp_wav)
+    time.sleep(0.02)
+    player.pause()
+    assert player.is_paused
+
+    t0 = time.time()
+    player.stop_audio()
+    assert time.time() - t0 < 1.0
+    assert not player.is_active
+
+
+def test_pcm_ring_buffer_wraps():
+    ring = PCMRingBuffer(8)
+    out = np.zeros(8, dtype=np.uint8)
+    ring.write(bytes([1, 2, 3, 4, 5, 6]))
+    assert ring.read_into(out[:4]) == 4
+    ring.write(bytes([7, 8, 9, 10, 11, 12]))
+    assert ring.available == 8
+
+    assert ring.read_into(out) == 8
+    assert list(out) == [5, 6, 7, 8, 9, 10, 11, 12]
+    assert not ring.finished
+    ring.finish()
+    assert ring.finished
+
+
+def test_play_pcm_stream(fake_raw_output_stream):
+    # Odd sized chunks that don't line up with frames or blocks
+    audio = bytes(range(1, 256)) * 20
+    chunks = [audio[i : i + 333] for i in range(0, len(audio), 333)]
+
+    play_pcm_stream(iter(chunks), 16000, blocksize=64, prefill_ms=10)
+
+    played = bytes(fake_raw_output_stream.last.played)
+    assert played[: len(audio)] == audio
+    assert not any(played[len(audio) :])
+
+
+def test_play_pcm_stream_stops_producer_on_failure(monkeypatch, patch_sounddevice):
+    import sounddevice as sd
+
+    def failing_stream(**kwargs):
+        raise RuntimeError("no device")
+
+    monkeypatch.setattr(sd, "RawOutputStream", failing_stream)
+    closed = threading.Event()
+
+    def slow_chunks():
+        try:
+            for _ in range(100):
+                time.sleep(0.05)
+                yield b"\x01\x00" * 64
+        finally:
+            closed.set()
+
+    start = time.monotonic()
+    with pytest.raises(RuntimeError, match="no device"):
+        play_pcm_stream(slow_chunks(), 16000)
+    assert time.monotonic() - start < 1.0
+    assert closed.wait(1.0)
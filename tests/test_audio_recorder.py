@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+import soundfile as sf
+
+from rpg_player.audio_recorder import SoundDeviceRecorder, _CaptureRing
+
+
+def test_capture_ring_wraps_and_drops():
+    ring = _CaptureRing(8)
+    ring.push(b"abcdef")
+    drained = bytearray()
+    assert ring.drain(lambda data: drained.extend(data.tobytes())) == 6
+    ring.push(b"ghijkl")
+    # Only 2 bytes of space left, so this is dropped rather than blocking
+    ring.push(b"mnop")
+    ring.drain(lambda data: drained.extend(data.tobytes()))
+    assert bytes(drained) == b"abcdefghijkl"
+    assert ring.dropped == 4
+
+
+def test_recorder_writes_everything_captured(tmp_path, fake_raw_input_stream):
+    path = tmp_path / "out.wav"
+    progress = []
+    recorder = SoundDeviceRecorder(samplerate=16000, blocksize=256)
+    recorder.register_progress_callback(progress.append)
+
+    asyncio.run(recorder.start_recording(path))
+    time.sleep(0.2)
+    asyncio.run(recorder.stop_recording())
+
+    captured = fake_raw_input_stream.last.captured
+    data, samplerate = sf.read(path, dtype="int16")
+    assert samplerate == 16000
+    assert len(captured) > 0
+    assert data.tobytes() == bytes(captured)
+    # Throttled, so there are fewer callbacks than blocks
+    assert 0 < len(progress) < len(captured) // 512
+
+
+def test_recorder_progress_interval(tmp_path, patch_sounddevice):
+    progress = []
+    recorder = SoundDeviceRecorder(samplerate=16000, blocksize=256)
+    recorder.register_progress_callback(progress.append, interval=10.0)
+
+    asyncio.run(recorder.start_recording(tmp_path / "out.wav"))
+    time.sleep(0.1)
+    asyncio.run(recorder.stop_recording())
+
+    assert len(progress) == 1
@@ -1,8 +1,17 @@
 import tempfile
+import threading
+import time
 from pathlib import Path
 from unittest.mock import MagicMock, Mock
 
-from rpg_player.audio_transcriber import OpenAIAudioTranscriber
+import numpy as np
+import soundfile as sf
+
+from rpg_player.audio_transcriber import (
+    DummyAudioTranscriber,
+    OpenAIAudioTranscriber,
+    find_speech,
+)
 
 
 def test_transcribe_returns_expected_text(monkeypatch):
@@ -52,3 +61,87 @@ def test_transcribe_returns_expected_text(monkeypatch):
     assert chunks == ["A ", "B ", "C"]
     assert fulls == ["A B C"]
     file_path.unlink()
+
+
+def test_transcribe_uses_cache(tmp_path, monkeypatch):
+    monkeypatch.delenv("RPG_NO_TRANSCRIPT_CACHE", raising=False)
+    file_path = tmp_path / "audio.wav"
+    file_path.write_bytes(b"dummy audio content")
+    mock_response = MagicMock()
+    mock_response.text = "foo bar"
+    mock_openai = Mock()
+    mock_openai.audio.transcriptions.create.return_value = mock_response
+
+    transcriber = OpenAIAudioTranscriber(mock_openai, cache_folder=tmp_path / "cache")
+    assert transcriber.transcribe(file_path) == "foo bar"
+    assert transcriber.transcribe(file_path) == "foo bar"
+    assert mock_openai.audio.transcriptions.create.call_count == 1
+
+    # Different parameters don't share the cached transcript
+    other = OpenAIAudioTranscriber(
+        mock_openai, language="fr", cache_folder=tmp_path / "cache"
+    )
+    other.transcribe(file_path)
+    assert mock_openai.audio.transcriptions.create.call_count == 2
+
+    monkeypatch.setenv("RPG_NO_TRANSCRIPT_CACHE", "1")
+    transcriber.transcribe(file_path)
+    assert mock_openai.audio.transcriptions.create.call_count == 3
+
+
+def _tone(seconds: float, sample_rate: int = 16000) -> np.ndarray:
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (0.5 * np.sin(2 * np.pi * 440 * t) * 32767).astype(np.int16)
+
+
+def test_find_speech_splits_on_pauses():
+    silence = np.zeros(16000, dtype=np.int16)
+    short_gap = np.zeros(1600, dtype=np.int16)
+    samples = np.concatenate(
+        [silence, _tone(0.5), short_gap, _tone(0.5), silence, _tone(0.3), silence]
+    )
+    regions = find_speech(samples / 32768.0, 16000)
+    assert len(regions) == 2
+    assert regions[0][0] < 16000 < regions[0][1]
+    assert regions[1][0] > 16000 + 8000 + 1600 + 8000
+    assert find_speech(np.zeros(16000), 16000) == []
+
+
+def test_whisper_transcribes_segments_in_order(tmp_path):
+    silence = np.zeros(16000, dtype=np.int16)
+    file_path = tmp_path / "speech.wav"
+    sf.write(file_path, np.concatenate([_tone(0.5), silence, _tone(0.5)]), 16000)
+
+    texts = iter(["Hello", "there"])
+    mock_openai = Mock()
+    mock_openai.audio.transcriptions.create.side_effect = lambda **kw: MagicMock(
+        text=next(texts)
+    )
+    transcriber = OpenAIAudioTranscriber(mock_openai, model="whisper-1")
+    assert transcriber.supports_async_out
+
+    calls = []
+    transcriber.transcribe_async_out(
+        file_path, lambda path, text, done: calls.append((text, done))
+    )
+    assert mock_openai.audio.transcriptions.create.call_count == 2
+    assert calls[-1] == ("Hello there", True)
+    assert "".join(text for text, done in calls[:-1]) == "Hello there"
+
+
+def test_dummy_transcribe_async_out_does_not_block():
+    transcriber = DummyAudioTranscriber(["Hello", "There"])
+    done = threading.Event()
+    calls = []
+
+    def handler(path, text, finished):
+        calls.append((text, finished))
+        if finished:
+            done.set()
+
+    start = time.monotonic()
+    transcriber.transcribe_async_out(Path("unused.wav"), handler)
+    assert time.monotonic() - start < 0.1
+    assert done.wait(2)
+    assert calls[-1] == ("", True)
+    assert all(text in ("Hello\n", "There\n") for text, _ in calls[:-1])
@@ -0,0 +1,81 @@
+import json
+
+from rpg_player.chat_message import ChatMessage, ChatMessages, MessageType
+
+
+def test_chat_messages_getitem():
+    messages = ChatMessages()
+    for i in range(5):
+        messages.append(ChatMessage.speech("Vex", f"Line {i}"))
+
+    assert messages[0].content == "Line 0"
+    assert messages[-1].content == "Line 4"
+    assert [m.content for m in messages[1:3]] == ["Line 1", "Line 2"]
+
+    # Slices are copies, changing them doesn't change the messages
+    messages[:2].clear()
+    assert len(messages) == 5
+
+
+def test_convert_to_openai_roles():
+    messages = ChatMessages(system_role="system")
+    cases = [
+        (ChatMessage.speech("Vex", "Hi"), "assistant"),
+        (ChatMessage.narration("DM", "A door opens"), "user"),
+        (ChatMessage.system("System", "Be nice"), "system"),
+        (ChatMessage.summary("Vex", "So far"), "assistant"),
+        (ChatMessage.summary("GM", "So far"), "user"),
+    ]
+    for message, role in cases:
+        converted = messages.convert_to_openai(message)
+        assert converted["role"] == role
+        assert converted["content"] == f"{message.author}: {message.content}"
+
+
+def test_chat_messages_extend():
+    messages = ChatMessages()
+    messages.append(ChatMessage.narration("DM", "Start"))
+    new = (ChatMessage.speech(name, "Hello") for name in ["Vex", "Bleb"])
+    messages.extend(new)
+
+    assert [m.author for m in messages] == ["DM", "Vex", "Bleb"]
+    assert messages.as_openai == [messages.convert_to_openai(m) for m in messages]
+
+
+def test_chat_messages_filter_type():
+    messages = ChatMessages()
+    messages.append(ChatMessage.narration("DM", "Start"))
+    messages.extend(
+        [ChatMessage.speech("Vex", "Hello"), ChatMessage.narration("DM", "Then")]
+    )
+    narration = messages.filter_type(MessageType.NARRATION)
+    assert [m.content for m in narration] == ["Start", "Then"]
+    assert messages.filter_type(MessageType.SUMMARY) == []
+
+
+def test_chat_message_dict_round_trip():
+    message = ChatMessage.summary("GM", "So far")
+    data = message.to_dict()
+    assert data["type"] == "summary"
+    assert ChatMessage.from_dict(data) == message
+
+
+def test_repeated_openai_messages_are_shared():
+    messages = ChatMessages()
+    messages.append(ChatMessage.narration("DM", "Roll for initiative"))
+    messages.append(ChatMessage.speech("Vex", "Ok"))
+    messages.append(ChatMessage.narration("DM", "Roll for initiative"))
+
+    first, _, third = messages.as_openai
+    assert first is third
+
+
+def test_load_messages_from_file(tmp_path):
+    path = tmp_path / "messages.jsonl"
+    messages = [ChatMessage.speech("Vex", "Hello"), ChatMessage.narration("DM", "Hi")]
+    lines = [json.dumps(m.to_dict()) for m in messages]
+    path.write_text("\n".join(lines) + "\n\n")
+
+    loaded = ChatMessages.load_messages_from_file(path)
+    assert loaded == messages
+    assert ChatMessages.load_messages_from_file(tmp_path / "missing.jsonl") == []
@@ -1,3 +1,5 @@
+import json
+import os
 from pathlib import Path
 
 from rpg_player.config import (
@@ -58,3 +60,23 @@ def test_from_dict():
     assert va.type == "piper"
     assert va.speakers == ["Foo", "Bar"]
     assert va.args == {"speaker_ids": {"Foo": 1, "Bar": 2}}
+
+
+def test_from_path_caches_until_changed(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(TEST_DATA))
+
+    config = Config.from_path(str(path))
+    assert config.messages_path == Path("foo/messages.json")
+    assert Config.from_path(path) is config
+
+    changed = dict(TEST_DATA, messages_path="bar/messages.json")
+    path.write_text(json.dumps(changed))
+    os.utime(path, ns=(0, 0))
+    assert Config.from_path(path).messages_path == Path("bar/messages.json")
+
+
+def test_api_keys_reuse_clients():
+    keys = APIKeys(openai="testkey", elevenlabs="testkey")
+    assert keys.get_openai_client() is keys.get_openai_client()
+    assert keys.get_elevenlabs_client() is keys.get_elevenlabs_client()
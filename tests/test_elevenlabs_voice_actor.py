@@ -0,0 +1,82 @@
+import wave
+from unittest.mock import Mock
+
+import pytest
+
+from rpg_player.chat_message import ChatMessage
+from rpg_player.elevenlabs_voice_actor import ElevenlabsVoiceActor, pcm_sample_rate
+from rpg_player.tts_cache import TTSCache
+
+
+def test_speak_message_uses_cache(tmp_path):
+    client = Mock()
+    client.text_to_speech.convert.return_value = [b"\x01\x00" * 100]
+    cache = TTSCache(tmp_path / "cache")
+    actor = ElevenlabsVoiceActor("Vex", client, "voice", tts_cache=cache)
+    message = ChatMessage.speech("Vex", "Hello there")
+
+    first = actor.speak_message(message, tmp_path / "out")
+    second = actor.speak_message(message, tmp_path / "out")
+
+    assert client.text_to_speech.convert.call_count == 1
+    assert first != second
+    assert first.read_bytes() == second.read_bytes()
+
+
+def test_output_format_and_latency(tmp_path):
+    client = Mock()
+    client.text_to_speech.convert.return_value = [b"\x01\x00" * 100]
+    actor = ElevenlabsVoiceActor(
+        "Vex", client, "voice", output_format="pcm_24000", file_latency_opt=1
+    )
+    path = actor.speak_message(ChatMessage.speech("Vex", "Hi"), tmp_path)
+
+    kwargs = client.text_to_speech.convert.call_args.kwargs
+    assert kwargs["output_format"] == "pcm_24000"
+    assert kwargs["optimize_streaming_latency"] == 1
+    with wave.open(str(path), "rb") as wf:
+        assert wf.getframerate() == 24000
+
+
+def test_pcm_sample_rate():
+    assert pcm_sample_rate("pcm_44100") == 44100
+    with pytest.raises(ValueError):
+        pcm_sample_rate("mp3_44100_128")
+
+
+def test_long_messages_are_synthesized_per_sentence(tmp_path):
+    sentences = [
+        "The door creaks open and a cold wind blows through the hall.",
+        "Somewhere in the dark, something large shifts its weight.",
+        "Vex reaches for her sword and listens very carefully.",
+    ]
+
+    def convert(text, **kwargs):
+        return [bytes([sentences.index(text) + 1, 0]) * 10]
+
+    client = Mock()
+    client.text_to_speech.convert.side_effect = convert
+    actor = ElevenlabsVoiceActor("Vex", client, "voice")
+    path = actor.speak_message(ChatMessage.speech("Vex", " ".join(sentences)), tmp_path)
+
+    calls = client.text_to_speech.convert.call_args_list
+    assert sorted(c.kwargs["text"] for c in calls) == sorted(sentences)
+    middle = next(c for c in calls if c.kwargs["text"] == sentences[1])
+    assert middle.kwargs["previous_text"] == sentences[0]
+    assert middle.kwargs["next_text"] == sentences[2]
+    with wave.open(str(path), "rb") as wf:
+        assert (
+            wf.readframes(30) == b"\x01\x00" * 10 + b"\x02\x00" * 10 + b"\x03\x00" * 10
+        )
+
+
+def test_empty_message_skips_api(tmp_path):
+    client = Mock()
+    actor = ElevenlabsVoiceActor("Vex", client, "voice")
+    path = actor.speak_message(ChatMessage.speech("Vex", "   "), tmp_path)
+    actor.speak_message_out_load(ChatMessage.speech("Vex", ""))
+
+    client.text_to_speech.convert.assert_not_called()
+    with wave.open(str(path), "rb") as wf:
+        assert wf.getframerate() == 16000
+        assert wf.getnframes() == 320
@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from rpg_player.chat_message import ChatMessage
+from rpg_player.message_transformer import (
+    AddElevenlabsAudioTagsTransformer,
+    ChatMessageTransformer,
+    NoOpMessageTranformer,
+    RemovePrefixMessageTransformer,
+    SequentialMessageTransformer,
+)
+
+
+def test_audio_tags_transformer_caches_responses():
+    client = Mock()
+    client.responses.create.return_value = SimpleNamespace(
+        output=[], output_text="[sighs] Hello there"
+    )
+    transformer = AddElevenlabsAudioTagsTransformer(client)
+
+    first = transformer.transform(ChatMessage.speech("Vex", "Hello there"))
+    second = transformer.transform(ChatMessage.speech("Vex", "Hello there"))
+
+    assert first.content == second.content == "[sighs] Hello there"
+    assert client.responses.create.call_count == 1
+
+    transformer.transform(ChatMessage.speech("Vex", "Goodbye"))
+    assert client.responses.create.call_count == 2
+
+
+def test_sequential_transformer_flattens_steps():
+    class Upper(ChatMessageTransformer):
+        def transform(self, message):
+            message.content = message.content.upper()
+            return message
+
+    inner = SequentialMessageTransformer([RemovePrefixMessageTransformer()])
+    transformer = SequentialMessageTransformer(
+        [NoOpMessageTranformer(), inner, Upper()]
+    )
+    assert len(transformer._steps) == 2
+
+    message = transformer.transform(ChatMessage.speech("Vex", "Vex: hello"))
+    assert message.content == "HELLO"
+
+
+def test_remove_prefix_transformer():
+    transformer = RemovePrefixMessageTransformer()
+    message = transformer.transform(ChatMessage.speech("Vex", "Vex:  Hello "))
+    assert message.content == "Hello"
+    untouched = transformer.transform(ChatMessage.speech("Vex", " Bob: Hi "))
+    assert untouched.content == " Bob: Hi "
@@ -0,0 +1,22 @@
+import os
+
+from rpg_player.prompt_parser import PromptParser
+
+
+def test_parse_path_renders_and_reloads(tmp_path):
+    path = tmp_path / "prompt.md"
+    path.write_text("You are {{ name }}.")
+
+    assert PromptParser({"name": "Vex"}).parse_path(path) == "You are Vex."
+    assert PromptParser({"name": "Bleb"}).parse_path(path) == "You are Bleb."
+
+    path.write_text("You are still {{ name }}.")
+    os.utime(path, ns=(0, 0))
+    assert PromptParser({"name": "Vex"}).parse_path(path) == "You are still Vex."
+
+
+def test_parse_path_with_unhashable_variables(tmp_path):
+    path = tmp_path / "prompt.md"
+    path.write_text("{{ names | join(', ') }}")
+
+    assert PromptParser({"names": ["Vex", "Bleb"]}).parse_path(path) == "Vex, Bleb"
@@ -0,0 +1,113 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import httpx
+import pytest
+from openai import RateLimitError
+
+from rpg_player.rate_limiter import AsyncResponsesLimiter, parse_reset_duration
+
+
+def _raw(headers: dict, parsed="ok"):
+    return SimpleNamespace(headers=headers, parse=lambda: parsed)
+
+
+def _rate_limit_error(headers: dict) -> RateLimitError:
+    request = httpx.Request("POST", "https://api.openai.com/v1/responses")
+    response = httpx.Response(429, headers=headers, request=request)
+    return RateLimitError("rate limited", response=response, body=None)
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [("1s", 1.0), ("6m0s", 360.0), ("20ms", 0.02), ("1h2m", 3720.0), ("", None)],
+)
+def test_parse_reset_duration(value, expected):
+    assert parse_reset_duration(value) == expected
+
+
+def test_limiter_retries_after_rate_limit():
+    client = Mock()
+    client.responses.with_raw_response.create = AsyncMock(
+        side_effect=[_rate_limit_error({"retry-after-ms": "10"}), _raw({})]
+    )
+    limiter = AsyncResponsesLimiter(client, max_retries=1)
+
+    result = asyncio.run(limiter.create(model="gpt-5"))
+
+    assert result == "ok"
+    assert client.responses.with_raw_response.create.await_count == 2
+
+
+def test_limiter_gives_up_after_max_retries():
+    client = Mock()
+    client.responses.with_raw_response.create = AsyncMock(
+        side_effect=_rate_limit_error({"retry-after-ms": "1"})
+    )
+    limiter = AsyncResponsesLimiter(client, max_retries=0)
+
+    with pytest.raises(RateLimitError):
+        asyncio.run(limiter.create(model="gpt-5"))
+
+
+def test_limiter_pauses_when_requests_run_out():
+    headers = {
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-requests": "2s",
+    }
+    client = Mock()
+    client.responses.with_raw_response.create = AsyncMock(return_value=_raw(headers))
+    limiter = AsyncResponsesLimiter(client)
+
+    asyncio.run(limiter.create(model="gpt-5"))
+
+    assert limiter._resume_at > 0
+
+
+def test_limiter_holds_permit_until_stream_is_read():
+    async def events(name: str):
+        for i in range(3):
+            await asyncio.sleep(0.01)
+            yield f"{name}-{i}"
+
+    names = iter(["first", "second"])
+    client = Mock()
+    client.responses.with_raw_response.create = AsyncMock(
+        side_effect=lambda **kwargs: _raw({}, events(next(names)))
+    )
+    limiter = AsyncResponsesLimiter(client, max_concurrency=1)
+    order: list[str] = []
+
+    async def caller():
+        stream = await limiter.create(model="gpt-5", stream=True)
+        async for event in stream:
+            order.append(event)
+
+    async def main():
+        await asyncio.gather(caller(), caller())
+
+    asyncio.run(main())
+
+    # The second request only starts once the first stream is used up
+    assert order == [f"first-{i}" for i in range(3)] + [f"second-{i}" for i in range(3)]
+    assert limiter._semaphore._value == 1
+
+
+def test_limiter_releases_permit_when_stream_closed():
+    async def events():
+        yield "only"
+
+    client = Mock()
+    client.responses.with_raw_response.create = AsyncMock(
+        return_value=_raw({}, events())
+    )
+    limiter = AsyncResponsesLimiter(client, max_concurrency=1)
+
+    async def main():
+        stream = await limiter.create(model="gpt-5", stream=True)
+        await stream.close()
+        await stream.close()
+
+    asyncio.run(main())
+    assert limiter._semaphore._value == 1
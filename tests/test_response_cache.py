@@ -0,0 +1,87 @@
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from rpg_player.response_cache import (
+    ResponseCache,
+    SemanticResponseCache,
+    SqliteResponseCache,
+)
+
+
+def test_make_key_is_stable():
+    a = ResponseCache.make_key({"model": "gpt-5", "input": [{"role": "user"}]})
+    b = ResponseCache.make_key({"input": [{"role": "user"}], "model": "gpt-5"})
+    c = ResponseCache.make_key({"model": "gpt-5-mini", "input": [{"role": "user"}]})
+    assert a == b
+    assert a != c
+
+
+def test_get_put_and_stats():
+    cache = ResponseCache(maxsize=2)
+    assert cache.get("a") is None
+    cache.put("a", "foo")
+    assert cache.get("a") == "foo"
+    stats = cache.stats
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.size == 1
+
+
+def test_lru_eviction():
+    cache = ResponseCache(maxsize=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    # Touch "a" so "b" is the least recently used
+    assert cache.get("a") == "1"
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_ttl_expiry():
+    cache = ResponseCache(ttl=0.01)
+    cache.put("a", "1")
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def _fake_embedding_client(vectors: dict):
+    def create(model, input):
+        return SimpleNamespace(data=[SimpleNamespace(embedding=vectors[input])])
+
+    openai = Mock()
+    openai.embeddings.create.side_effect = create
+    return openai
+
+
+def test_semantic_cache_hits_similar_text():
+    openai = _fake_embedding_client(
+        {"look around": [1.0, 0.0], "i look around": [0.99, 0.05], "run": [0, 1.0]}
+    )
+    cache = SemanticResponseCache(openai, threshold=0.9)
+    scope = SemanticResponseCache.make_scope("prompt")
+
+    cache.add(scope, cache.embed("look around"), "You see a room")
+
+    assert cache.lookup(scope, cache.embed("i look around")) == "You see a room"
+    assert cache.lookup(scope, cache.embed("run")) is None
+    other_scope = SemanticResponseCache.make_scope("other prompt")
+    assert cache.lookup(other_scope, cache.embed("i look around")) is None
+    assert cache.stats.hits == 1
+
+
+def test_sqlite_cache_persists(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = SqliteResponseCache(path)
+    cache.put("key", "Hello")
+    cache.close()
+
+    reopened = SqliteResponseCache(path)
+    assert reopened.get("key") == "Hello"
+    assert reopened.get("missing") is None
+    assert reopened.stats.hits == 1
+    assert reopened.stats.misses == 1
+    reopened.close()
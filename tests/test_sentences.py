@@ -0,0 +1,33 @@
+from rpg_player.sentences import SentenceBuffer, split_sentences
+
+
+def test_split_sentences():
+    text = 'Hello there. "Are you ok?" she asked! Yes… Fine'
+    assert split_sentences(text) == [
+        "Hello there.",
+        '"Are you ok?"',
+        "she asked!",
+        "Yes…",
+        "Fine",
+    ]
+
+
+def test_split_sentences_keeps_decimals():
+    assert split_sentences("It costs 3.5 gold. Deal?") == [
+        "It costs 3.5 gold.",
+        "Deal?",
+    ]
+
+
+def test_sentence_buffer_streams_sentences():
+    buffer = SentenceBuffer(min_length=0)
+    assert buffer.feed("Hello the") == []
+    assert buffer.feed("re. How ") == ["Hello there."]
+    assert buffer.feed("are you?") == []
+    assert buffer.flush() == ["How are you?"]
+    assert buffer.flush() == []
+
+
+def test_sentence_buffer_joins_short_sentences():
+    buffer = SentenceBuffer(min_length=10)
+    assert buffer.feed("Hi. I am Bob the brave. ") == ["Hi. I am Bob the brave."]
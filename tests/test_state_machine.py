@@ -0,0 +1,75 @@
+import threading
+from pathlib import Path
+from typing import Optional
+
+from rpg_player.chat_message import ChatMessage, MessageType
+from rpg_player.state_machine import StateMachine
+from rpg_player.voice_actor import VoiceActor, VoiceActorManager
+
+
+class RecordingVoiceActor(VoiceActor):
+    """
+    Speaks out loud by recording the message, optionally waiting on an event
+    """
+
+    def __init__(self, release: Optional[threading.Event] = None):
+        self.spoken = []
+        self.started = threading.Event()
+        self.release = release
+
+    def speak_message(self, message: ChatMessage, folder_path: Path) -> Path:
+        raise NotImplementedError
+
+    def should_speak_message(self, message: ChatMessage) -> bool:
+        return message.type is MessageType.SPEECH
+
+    @property
+    def speaker_names(self):
+        return frozenset({"bob"})
+
+    @property
+    def can_speak_out_loud(self) -> bool:
+        return True
+
+    def speak_message_out_load(self, message: ChatMessage) -> None:
+        self.started.set()
+        if self.release is not None:
+            self.release.wait(5)
+        self.spoken.append(message.content)
+
+
+def _state_machine(actor: VoiceActor) -> StateMachine:
+    voice_actors = VoiceActorManager()
+    voice_actors.register_actor(actor)
+    return StateMachine([], voice_actors)
+
+
+def test_speak_message_plays_in_order(patch_sounddevice):
+    actor = RecordingVoiceActor()
+    state_machine = _state_machine(actor)
+    futures = [
+        state_machine.speak_message(ChatMessage.speech("Bob", f"Line {i}"))
+        for i in range(5)
+    ]
+    for future in futures:
+        future.result(timeout=5)
+    state_machine.close()
+
+    assert actor.spoken == [f"Line {i}" for i in range(5)]
+
+
+def test_close_drops_pending_speech(patch_sounddevice):
+    release = threading.Event()
+    actor = RecordingVoiceActor(release)
+    state_machine = _state_machine(actor)
+    futures = [
+        state_machine.speak_message(ChatMessage.speech("Bob", f"Line {i}"))
+        for i in range(3)
+    ]
+    assert actor.started.wait(5)
+
+    threading.Timer(0.1, release.set).start()
+    state_machine.close()
+
+    assert actor.spoken == ["Line 0"]
+    assert all(future.cancelled() for future in futures[1:])
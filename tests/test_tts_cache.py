@@ -0,0 +1,41 @@
+import io
+import os
+import wave
+
+from rpg_player.tts_cache import TTSCache, pcm_to_wav
+
+
+def test_tts_cache_put_and_get(tmp_path):
+    cache = TTSCache(tmp_path, memory_size=1)
+    key = TTSCache.make_key(0, "Hello there")
+    assert cache.get("voice", key) is None
+
+    cache.put("voice", key, b"wav data")
+    assert cache.get("voice", key) == b"wav data"
+    assert cache.path_for("voice", key).read_bytes() == b"wav data"
+
+    # Evicted from memory but still read from disk
+    other = TTSCache.make_key(1, "Hello there")
+    assert other != key
+    cache.put("voice", other, b"other data")
+    assert TTSCache(tmp_path).get("voice", key) == b"wav data"
+    assert cache.get("voice", key) == b"wav data"
+
+
+def test_pcm_to_wav():
+    pcm = bytes(range(100))
+    data = pcm_to_wav(pcm, 22050)
+    with wave.open(io.BytesIO(data), "rb") as wf:
+        assert wf.getframerate() == 22050
+        assert wf.getnchannels() == 1
+        assert wf.getsampwidth() == 2
+        assert wf.readframes(wf.getnframes()) == pcm
+
+
+def test_tts_cache_ttl(tmp_path):
+    TTSCache(tmp_path).put("voice", "key", b"old")
+    path = TTSCache(tmp_path).path_for("voice", "key")
+    os.utime(path, (0, 0))
+
+    assert TTSCache(tmp_path, ttl=60).get("voice", "key") is None
+    assert TTSCache(tmp_path).get("voice", "key") == b"old"
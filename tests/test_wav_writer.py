@@ -0,0 +1,19 @@
+import wave
+
+from rpg_player.wav_writer import RawWavWriter
+
+
+def test_raw_wav_writer(tmp_path):
+    path = tmp_path / "out.wav"
+    chunks = [b"\x01\x00" * 100, b"\x02\x00" * 50]
+    with RawWavWriter(path, 16000) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+
+    assert writer.data_size == 300
+    with wave.open(str(path), "rb") as wf:
+        assert wf.getnchannels() == 1
+        assert wf.getsampwidth() == 2
+        assert wf.getframerate() == 16000
+        assert wf.getnframes() == 150
+        assert wf.readframes(150) == b"".join(chunks)